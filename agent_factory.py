@@ -1,13 +1,24 @@
 """
 動的エージェント生成システム
 トピックや文脈に応じて専門エージェントを自動生成する
+
+文字列処理中心のモジュールのためNumba/Cythonによる高速化は対象外（README「パフォーマンス」参照）
 """
 
 import json
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+import re
+from functools import lru_cache
+from itertools import chain
+from string import Formatter
+from typing import Dict, List, Any, Optional, Tuple
+from dataclasses import dataclass, replace
 from enum import Enum
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 
 class ExpertiseArea(Enum):
     """専門分野の定義"""
@@ -23,9 +34,11 @@ class ExpertiseArea(Enum):
     SOCIAL = "social"
 
 
-@dataclass
+@dataclass(frozen=True)
 class AgentProfile:
     """エージェントプロファイル"""
+    # Python 3.8/3.9ではdataclass(slots=True)が使えないため__slots__を直接定義（フィールドに既定値が無いことが前提）
+    __slots__ = ("name", "role", "expertise_area", "personality", "system_message", "debate_style", "knowledge_focus", "interaction_patterns")
     name: str
     role: str
     expertise_area: ExpertiseArea
@@ -36,6 +49,53 @@ class AgentProfile:
     interaction_patterns: List[str]
 
 
+def _compile_template(template: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """テンプレート文字列を固定部分とプレースホルダ名の配列に事前分解"""
+    statics = []
+    fields = []
+    for literal_text, field_name, _, _ in Formatter().parse(template):
+        statics.append(literal_text)
+        if field_name is not None:
+            fields.append(field_name)
+    
+    # 固定部分は常にプレースホルダより1つ多くなるように揃える
+    if len(statics) == len(fields):
+        statics.append("")
+    
+    return tuple(statics), tuple(fields)
+
+
+def _render_template(compiled: Tuple[Tuple[str, ...], Tuple[str, ...]], context: Dict[str, str]) -> str:
+    """事前分解済みテンプレートに値を埋め込んで文字列を生成"""
+    statics, fields = compiled
+    values = [context[field] for field in fields] + [""]
+    return "".join(chain.from_iterable(zip(statics, values)))
+
+
+@lru_cache(maxsize=64)
+def _interaction_patterns_for(debate_style: str) -> Tuple[str, ...]:
+    """議論スタイルに基づいて相互作用パターンを生成（スタイルごとにキャッシュ）"""
+    patterns = []
+    
+    if "データ駆動" in debate_style:
+        patterns.append("具体的な数値や統計を要求する")
+        patterns.append("エビデンスの出典を確認する")
+    
+    if "ユーザー体験重視" in debate_style:
+        patterns.append("ユーザーの視点で問題を再定義する")
+        patterns.append("実際の使用例を求める")
+    
+    if "創造的" in debate_style or "革新的" in debate_style:
+        patterns.append("従来とは異なる視点を提示する")
+        patterns.append("アナロジーや比喩を活用する")
+    
+    if "リスク分析" in debate_style:
+        patterns.append("潜在的な問題点を指摘する")
+        patterns.append("代替案を提案する")
+    
+    return tuple(patterns)
+
+
 class AgentFactory:
     """動的エージェント生成ファクトリー"""
     
@@ -45,7 +105,7 @@ class AgentFactory:
         
     def _load_agent_templates(self) -> Dict[ExpertiseArea, Dict[str, Any]]:
         """エージェントテンプレートを定義"""
-        return {
+        templates = {
             ExpertiseArea.TECHNOLOGY: {
                 "profiles": [
                     {
@@ -134,6 +194,24 @@ class AgentFactory:
                 ]
             }
         }
+        
+        # system_templateは読み込み時に一度だけ分解し、
+        # トピックに依存しない部分はプロファイルの雛形として事前に構築しておく
+        for area, template in templates.items():
+            for profile in template["profiles"]:
+                profile["compiled_template"] = _compile_template(profile.pop("system_template"))
+                profile["skeleton"] = AgentProfile(
+                    name=profile["name"],
+                    role=f"{area.value}_expert",
+                    expertise_area=area,
+                    personality=profile["personality"],
+                    system_message="",
+                    debate_style=profile["debate_style"],
+                    knowledge_focus=profile["knowledge_focus"],
+                    interaction_patterns=list(_interaction_patterns_for(profile["debate_style"]))
+                )
+        
+        return templates
     
     def analyze_topic_and_generate_agents(self, topic: str, num_agents: int = 4) -> List[AgentProfile]:
         """トピック分析に基づいて適切なエージェントを生成"""
@@ -143,6 +221,7 @@ class AgentFactory:
         
         # 関連する専門分野から適切な数のエージェントを選択
         selected_agents = []
+        selected_areas = set()
         
         for area in relevant_areas[:num_agents]:
             if area in self.agent_templates:
@@ -154,57 +233,38 @@ class AgentFactory:
                     area, profile_data, topic
                 )
                 selected_agents.append(agent_profile)
+                selected_areas.add(area)
         
         # 不足分を補完（多様性確保）
-        while len(selected_agents) < num_agents:
-            remaining_areas = [area for area in ExpertiseArea if area not in [agent.expertise_area for agent in selected_agents]]
-            if remaining_areas and remaining_areas[0] in self.agent_templates:
-                area = remaining_areas[0]
-                profile_data = self.agent_templates[area]["profiles"][0]
-                agent_profile = self._create_agent_profile(area, profile_data, topic)
-                selected_agents.append(agent_profile)
-            else:
+        # ExpertiseAreaの定義順に1回だけ走査し、テンプレートのない分野に達したら打ち切る
+        for area in ExpertiseArea:
+            if len(selected_agents) >= num_agents:
+                break
+            if area in selected_areas:
+                continue
+            if area not in self.agent_templates:
                 break
+            profile_data = self.agent_templates[area]["profiles"][0]
+            agent_profile = self._create_agent_profile(area, profile_data, topic)
+            selected_agents.append(agent_profile)
+            selected_areas.add(area)
         
         return selected_agents
     
     def _create_agent_profile(self, area: ExpertiseArea, profile_data: Dict[str, Any], topic: str) -> AgentProfile:
         """エージェントプロファイルを作成"""
         
-        system_message = profile_data["system_template"].format(topic=topic)
+        system_message = _render_template(profile_data["compiled_template"], {"topic": topic})
         
-        return AgentProfile(
-            name=profile_data["name"],
-            role=f"{area.value}_expert",
-            expertise_area=area,
-            personality=profile_data["personality"],
+        # トピックに依存するのはsystem_messageのみ。replace()は浅いコピーのため、
+        # リスト項目はエージェントごとに複製して雛形や他のエージェントと共有しない
+        skeleton = profile_data["skeleton"]
+        return replace(
+            skeleton,
             system_message=system_message,
-            debate_style=profile_data["debate_style"],
-            knowledge_focus=profile_data["knowledge_focus"],
-            interaction_patterns=self._generate_interaction_patterns(profile_data["debate_style"])
+            knowledge_focus=list(skeleton.knowledge_focus),
+            interaction_patterns=list(skeleton.interaction_patterns)
         )
-    
-    def _generate_interaction_patterns(self, debate_style: str) -> List[str]:
-        """議論スタイルに基づいて相互作用パターンを生成"""
-        patterns = []
-        
-        if "データ駆動" in debate_style:
-            patterns.append("具体的な数値や統計を要求する")
-            patterns.append("エビデンスの出典を確認する")
-        
-        if "ユーザー体験重視" in debate_style:
-            patterns.append("ユーザーの視点で問題を再定義する")
-            patterns.append("実際の使用例を求める")
-        
-        if "創造的" in debate_style or "革新的" in debate_style:
-            patterns.append("従来とは異なる視点を提示する")
-            patterns.append("アナロジーや比喩を活用する")
-        
-        if "リスク分析" in debate_style:
-            patterns.append("潜在的な問題点を指摘する")
-            patterns.append("代替案を提案する")
-        
-        return patterns
 
 
 class TopicAnalyzer:
@@ -256,24 +316,66 @@ class TopicAnalyzer:
                 "教師", "学生", "スキル", "能力開発", "人材育成"
             ]
         }
+        # 小文字化はキーワードごとに一度だけ行う
+        self.expertise_keywords_lc = {
+            area: tuple(keyword.lower() for keyword in keywords)
+            for area, keywords in self.expertise_keywords.items()
+        }
+        self._build_keyword_matcher()
+    
+    def _build_keyword_matcher(self):
+        """全キーワードを一度に走査するためのマッチャーを構築"""
+        # スコアは分野の序数で配列を引く（序数はexpertise_keywordsの定義順）
+        self._areas = tuple(self.expertise_keywords_lc)
+        
+        # 同じキーワードが複数分野に属する場合があるため、キーワード→分野序数リストで保持
+        self._kw_to_area = {}
+        for area_index, keywords in enumerate(self.expertise_keywords_lc.values()):
+            for keyword in keywords:
+                self._kw_to_area.setdefault(keyword, []).append(area_index)
+        
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for keyword in self._kw_to_area:
+                automaton.add_word(keyword, keyword)
+            automaton.make_automaton()
+            self._automaton = automaton
+            return
+        
+        # pyahocorasickが無い場合は正規表現で代替
+        # 各位置で最長一致を取り、その接頭辞となるキーワードも一致扱いにする
+        self._automaton = None
+        ordered = sorted(self._kw_to_area, key=len, reverse=True)
+        self._keyword_pattern = re.compile("(?=(" + "|".join(map(re.escape, ordered)) + "))")
+        self._keyword_prefixes = {
+            keyword: [other for other in self._kw_to_area if keyword.startswith(other)]
+            for keyword in self._kw_to_area
+        }
+    
+    def _find_keywords(self, topic_lower: str) -> set:
+        """トピック中に出現するキーワードを1回の走査で収集"""
+        if self._automaton is not None:
+            return {keyword for _, keyword in self._automaton.iter(topic_lower)}
+        
+        found = set()
+        for match in self._keyword_pattern.finditer(topic_lower):
+            found.update(self._keyword_prefixes[match.group(1)])
+        return found
     
     def identify_relevant_expertise(self, topic: str) -> List[ExpertiseArea]:
         """トピックから関連する専門分野を特定"""
         topic_lower = topic.lower()
-        relevance_scores = {}
+        relevance_scores = [0] * len(self._areas)
         
-        for area, keywords in self.expertise_keywords.items():
-            score = 0
-            for keyword in keywords:
-                if keyword.lower() in topic_lower:
-                    score += 1
-            relevance_scores[area] = score
+        for keyword in self._find_keywords(topic_lower):
+            for area_index in self._kw_to_area[keyword]:
+                relevance_scores[area_index] += 1
         
-        # スコアの高い順にソート
-        sorted_areas = sorted(relevance_scores.items(), key=lambda x: x[1], reverse=True)
+        # スコアの高い順にソート（同点は定義順を維持）
+        sorted_indices = sorted(range(len(self._areas)), key=relevance_scores.__getitem__, reverse=True)
         
         # スコアが0より大きい分野を返す、最低2つは返す
-        relevant_areas = [area for area, score in sorted_areas if score > 0]
+        relevant_areas = [self._areas[i] for i in sorted_indices if relevance_scores[i] > 0]
         
         if len(relevant_areas) < 2:
             # 関連性が低い場合でも、多様性確保のため最低限の分野を追加
@@ -1,13 +1,17 @@
 """
 エージェント間競合・協調システム
 意見の対立、合意形成、投票システムを管理
+
+文字列処理中心のモジュールのためNumba/Cythonによる高速化は対象外（README「パフォーマンス」参照）
 """
 
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Mapping, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
+from types import MappingProxyType
 import json
-from collections import defaultdict, Counter
+import re
+from collections import Counter
 
 
 class OpinionType(Enum):
@@ -28,9 +32,85 @@ class ConflictLevel(Enum):
     DEADLOCK = "deadlock"        # 膠着状態
 
 
-@dataclass
+# 肯定的な意見タイプ（合意レベル計算などで共通利用）
+_POSITIVE_TYPES = frozenset({OpinionType.AGREE, OpinionType.STRONGLY_AGREE})
+
+# 軽微な不一致の解決戦略
+_MILD_DISAGREEMENT_RESOLUTION = MappingProxyType({
+    "strategy": "clarification_and_evidence",
+    "action": "各エージェントに具体的な根拠の提示を求める",
+    "next_steps": (
+        "反対意見のエージェントに詳細な説明を求める",
+        "共通点を見つけて議論の焦点を絞る",
+        "追加の情報収集を提案する"
+    ),
+    "resolution_probability": 0.8
+})
+
+
+# 中程度の対立の解決戦略
+_MODERATE_CONFLICT_RESOLUTION = MappingProxyType({
+    "strategy": "structured_debate",
+    "action": "構造化された議論を実施する",
+    "next_steps": (
+        "各立場の代表者を選出する",
+        "論点を明確に整理する",
+        "段階的な合意形成を行う",
+        "第三者の意見を求める"
+    ),
+    "resolution_probability": 0.6
+})
+
+
+# 強い対立の解決戦略
+_STRONG_CONFLICT_RESOLUTION = MappingProxyType({
+    "strategy": "mediation_and_compromise",
+    "action": "仲裁と妥協案の模索",
+    "next_steps": (
+        "中立的な仲裁者を設置する",
+        "各立場の核心的価値を特定する",
+        "妥協可能な点を見つける",
+        "段階的実施案を検討する"
+    ),
+    "resolution_probability": 0.4
+})
+
+
+# 膠着状態の解決戦略
+_DEADLOCK_RESOLUTION = MappingProxyType({
+    "strategy": "alternative_approach",
+    "action": "根本的にアプローチを変更する",
+    "next_steps": (
+        "問題の再定義を行う",
+        "新しい視点や専門家を投入する",
+        "部分的な解決策を模索する",
+        "将来的な再検討を計画する"
+    ),
+    "resolution_probability": 0.2
+})
+
+
+# デフォルト解決策
+_DEFAULT_RESOLUTION = MappingProxyType({
+    "strategy": "consensus_building",
+    "action": "合意形成を促進する",
+    "next_steps": (
+        "共通の理解を確認する",
+        "次のステップを計画する"
+    ),
+    "resolution_probability": 0.9
+})
+
+
+# 共通テーマ抽出用トークナイザ（空白で区切られない日本語にも対応）
+_THEME_TOKEN_PATTERN = re.compile(r"[\w一-龠ぁ-んァ-ヶ]{2,}")
+
+
+@dataclass(frozen=True)
 class Opinion:
     """意見データ構造"""
+    # Python 3.8/3.9ではdataclass(slots=True)が使えないため__slots__を直接定義（フィールドに既定値が無いことが前提）
+    __slots__ = ("agent_name", "content", "opinion_type", "confidence", "evidence", "related_topics", "timestamp")
     agent_name: str
     content: str
     opinion_type: OpinionType
@@ -40,9 +120,10 @@ class Opinion:
     timestamp: str
 
 
-@dataclass
+@dataclass(frozen=True)
 class Consensus:
     """合意データ構造"""
+    __slots__ = ("topic", "agreed_points", "disagreed_points", "consensus_level", "participating_agents", "resolution_method")
     topic: str
     agreed_points: List[str]
     disagreed_points: List[str]
@@ -63,19 +144,19 @@ class OpinionConflictResolver:
             ConflictLevel.DEADLOCK: self._deadlock_strategy
         }
     
-    def analyze_conflict_level(self, opinions: List[Opinion]) -> ConflictLevel:
+    def analyze_conflict_level(self, opinions: List[Opinion], type_counts: Optional[Counter] = None) -> ConflictLevel:
         """意見から対立レベルを分析"""
         if len(opinions) < 2:
             return ConflictLevel.HARMONY
         
-        opinion_types = [op.opinion_type for op in opinions]
-        type_counts = Counter(opinion_types)
+        if type_counts is None:
+            type_counts = Counter(op.opinion_type for op in opinions)
         
-        # 強い対立意見の数をカウント
-        strong_negative = type_counts.get(OpinionType.STRONGLY_DISAGREE, 0)
-        negative = type_counts.get(OpinionType.DISAGREE, 0)
-        positive = type_counts.get(OpinionType.AGREE, 0)
-        strong_positive = type_counts.get(OpinionType.STRONGLY_AGREE, 0)
+        # 強い対立意見の数をカウント（Counterは未出現のキーに0を返す）
+        strong_negative = type_counts[OpinionType.STRONGLY_DISAGREE]
+        negative = type_counts[OpinionType.DISAGREE]
+        positive = type_counts[OpinionType.AGREE]
+        strong_positive = type_counts[OpinionType.STRONGLY_AGREE]
         
         total_strong_opinions = strong_negative + strong_positive
         total_conflicting = strong_negative + negative + positive + strong_positive
@@ -89,9 +170,9 @@ class OpinionConflictResolver:
         else:
             return ConflictLevel.HARMONY
     
-    def resolve_conflict(self, opinions: List[Opinion], topic: str) -> Dict[str, Any]:
+    def resolve_conflict(self, opinions: List[Opinion], topic: str, type_counts: Optional[Counter] = None) -> Mapping[str, Any]:
         """対立を解決する"""
-        conflict_level = self.analyze_conflict_level(opinions)
+        conflict_level = self.analyze_conflict_level(opinions, type_counts)
         
         if conflict_level in self.resolution_strategies:
             resolution = self.resolution_strategies[conflict_level](opinions, topic)
@@ -107,72 +188,25 @@ class OpinionConflictResolver:
         
         return resolution
     
-    def _mild_disagreement_strategy(self, opinions: List[Opinion], topic: str) -> Dict[str, Any]:
+    def _mild_disagreement_strategy(self, opinions: List[Opinion], topic: str) -> Mapping[str, Any]:
         """軽微な不一致の解決戦略"""
-        return {
-            "strategy": "clarification_and_evidence",
-            "action": "各エージェントに具体的な根拠の提示を求める",
-            "next_steps": [
-                "反対意見のエージェントに詳細な説明を求める",
-                "共通点を見つけて議論の焦点を絞る",
-                "追加の情報収集を提案する"
-            ],
-            "resolution_probability": 0.8
-        }
+        return _MILD_DISAGREEMENT_RESOLUTION
     
-    def _moderate_conflict_strategy(self, opinions: List[Opinion], topic: str) -> Dict[str, Any]:
+    def _moderate_conflict_strategy(self, opinions: List[Opinion], topic: str) -> Mapping[str, Any]:
         """中程度の対立の解決戦略"""
-        return {
-            "strategy": "structured_debate",
-            "action": "構造化された議論を実施する",
-            "next_steps": [
-                "各立場の代表者を選出する",
-                "論点を明確に整理する",
-                "段階的な合意形成を行う",
-                "第三者の意見を求める"
-            ],
-            "resolution_probability": 0.6
-        }
+        return _MODERATE_CONFLICT_RESOLUTION
     
-    def _strong_conflict_strategy(self, opinions: List[Opinion], topic: str) -> Dict[str, Any]:
+    def _strong_conflict_strategy(self, opinions: List[Opinion], topic: str) -> Mapping[str, Any]:
         """強い対立の解決戦略"""
-        return {
-            "strategy": "mediation_and_compromise",
-            "action": "仲裁と妥協案の模索",
-            "next_steps": [
-                "中立的な仲裁者を設置する",
-                "各立場の核心的価値を特定する",
-                "妥協可能な点を見つける",
-                "段階的実施案を検討する"
-            ],
-            "resolution_probability": 0.4
-        }
+        return _STRONG_CONFLICT_RESOLUTION
     
-    def _deadlock_strategy(self, opinions: List[Opinion], topic: str) -> Dict[str, Any]:
+    def _deadlock_strategy(self, opinions: List[Opinion], topic: str) -> Mapping[str, Any]:
         """膠着状態の解決戦略"""
-        return {
-            "strategy": "alternative_approach",
-            "action": "根本的にアプローチを変更する",
-            "next_steps": [
-                "問題の再定義を行う",
-                "新しい視点や専門家を投入する",
-                "部分的な解決策を模索する",
-                "将来的な再検討を計画する"
-            ],
-            "resolution_probability": 0.2
-        }
+        return _DEADLOCK_RESOLUTION
     
-    def _default_resolution(self, opinions: List[Opinion], topic: str) -> Dict[str, Any]:
+    def _default_resolution(self, opinions: List[Opinion], topic: str) -> Mapping[str, Any]:
         """デフォルト解決策"""
-        return {
-            "strategy": "consensus_building",
-            "action": "合意形成を促進する",
-            "next_steps": [
-                "共通の理解を確認する",
-                "次のステップを計画する"
-            ],
-            "resolution_probability": 0.9
-        }
+        return _DEFAULT_RESOLUTION
 
 
 class ConsensusBuilder:
@@ -181,7 +215,7 @@ class ConsensusBuilder:
     def __init__(self):
         self.consensus_history = []
         
-    def build_consensus(self, opinions: List[Opinion], topic: str) -> Consensus:
+    def build_consensus(self, opinions: List[Opinion], topic: str, type_counts: Optional[Counter] = None) -> Consensus:
         """意見から合意を構築"""
         
         # 合意点と不一致点を抽出
@@ -189,7 +223,7 @@ class ConsensusBuilder:
         disagreed_points = self._extract_disagreed_points(opinions)
         
         # 合意レベルを計算
-        consensus_level = self._calculate_consensus_level(opinions)
+        consensus_level = self._calculate_consensus_level(opinions, type_counts)
         
         consensus = Consensus(
             topic=topic,
@@ -209,7 +243,7 @@ class ConsensusBuilder:
         agreed_points = []
         positive_opinions = [
             op for op in opinions 
-            if op.opinion_type in [OpinionType.AGREE, OpinionType.STRONGLY_AGREE]
+            if op.opinion_type in _POSITIVE_TYPES
         ]
         
         if len(positive_opinions) >= len(opinions) * 0.6:
@@ -235,30 +269,28 @@ class ConsensusBuilder:
     
     def _extract_common_themes(self, contents: List[str]) -> List[str]:
         """共通テーマを抽出（簡易実装）"""
-        # キーワードベースの簡易実装
-        common_words = []
-        word_counts = defaultdict(int)
-        
-        for content in contents:
-            words = content.split()
-            for word in words:
-                if len(word) > 3:  # 短い単語を除外
-                    word_counts[word] += 1
-        
-        # 複数のコンテンツに出現する単語を抽出
-        for word, count in word_counts.items():
-            if count >= 2:
-                common_words.append(word)
-        
-        return common_words[:3]  # 最大3つまで
+        # キーワードベースの簡易実装（短い単語は除外）
+        word_counts = Counter(
+            word
+            for content in contents
+            for word in _THEME_TOKEN_PATTERN.findall(content)
+            if len(word) > 3
+        )
+        
+        # 複数回出現する単語を頻度順に最大3つまで抽出
+        return [word for word, count in word_counts.most_common(3) if count >= 2]
     
-    def _calculate_consensus_level(self, opinions: List[Opinion]) -> float:
+    def _calculate_consensus_level(self, opinions: List[Opinion], type_counts: Optional[Counter] = None) -> float:
         """合意レベルを計算"""
         if not opinions:
             return 0.0
         
-        positive_count = sum(1 for op in opinions if op.opinion_type in [OpinionType.AGREE, OpinionType.STRONGLY_AGREE])
-        neutral_count = sum(1 for op in opinions if op.opinion_type == OpinionType.NEUTRAL)
+        # 1回の走査で意見タイプを集計
+        if type_counts is None:
+            type_counts = Counter(op.opinion_type for op in opinions)
+        
+        positive_count = type_counts[OpinionType.AGREE] + type_counts[OpinionType.STRONGLY_AGREE]
+        neutral_count = type_counts[OpinionType.NEUTRAL]
         negative_count = len(opinions) - positive_count - neutral_count
         
         # 加重平均で計算
@@ -289,36 +321,35 @@ class VotingSystem:
         
         # 簡易投票シミュレーション
         import random
-        votes = {}
         
-        for agent in agents:
-            # エージェントの特性に基づいた投票傾向をシミュレート
-            vote = random.choice(options)
-            votes[agent] = vote
+        # エージェントの特性に基づいた投票傾向をシミュレート（全員分を一括抽選）
+        picks = random.choices(options, k=len(agents))
+        votes = dict(zip(agents, picks))
         
         # 結果集計
         vote_counts = Counter(votes.values())
         total_votes = len(votes)
+        # 得票順の並びは勝者とマージンで共有する
+        sorted_counts = vote_counts.most_common()
         
         results = {
             "question": question,
             "options": options,
             "votes": votes,
             "results": dict(vote_counts),
-            "winner": vote_counts.most_common(1)[0][0] if vote_counts else None,
+            "winner": sorted_counts[0][0] if sorted_counts else None,
             "participation_rate": total_votes / len(agents) if agents else 0,
-            "margin": self._calculate_margin(vote_counts, total_votes)
+            "margin": self._calculate_margin(sorted_counts, total_votes)
         }
         
         self.voting_history.append(results)
         return results
     
-    def _calculate_margin(self, vote_counts: Counter, total_votes: int) -> float:
-        """勝利マージンを計算"""
-        if not vote_counts or len(vote_counts) < 2:
+    def _calculate_margin(self, sorted_counts: List[Tuple[str, int]], total_votes: int) -> float:
+        """勝利マージンを計算（sorted_countsはCounter.most_common()の結果）"""
+        if not sorted_counts or len(sorted_counts) < 2:
             return 1.0
         
-        sorted_counts = vote_counts.most_common()
         if len(sorted_counts) >= 2:
             winner_count = sorted_counts[0][1]
             runner_up_count = sorted_counts[1][1]
@@ -334,16 +365,26 @@ class VotingSystem:
             return {"message": "投票履歴がありません"}
         
         total_votes = len(self.voting_history)
-        close_votes = sum(1 for vote in self.voting_history if vote["margin"] < 0.2)
-        unanimous_votes = sum(1 for vote in self.voting_history if vote["margin"] == 1.0)
-        
+        close_votes = 0
+        unanimous_votes = 0
+        participation_sum = 0.0
+
+        # 履歴を1回だけ走査して各指標を集計
+        for vote in self.voting_history:
+            margin = vote["margin"]
+            if margin < 0.2:
+                close_votes += 1
+            if margin == 1.0:
+                unanimous_votes += 1
+            participation_sum += vote["participation_rate"]
+
         return {
             "total_votes_conducted": total_votes,
             "close_votes": close_votes,
             "close_vote_rate": close_votes / total_votes,
             "unanimous_votes": unanimous_votes,
             "unanimous_rate": unanimous_votes / total_votes,
-            "average_participation": sum(vote["participation_rate"] for vote in self.voting_history) / total_votes
+            "average_participation": participation_sum / total_votes
         }
 
 
@@ -358,14 +399,17 @@ class CollaborationOrchestrator:
     def process_agent_interactions(self, opinions: List[Opinion], topic: str) -> Dict[str, Any]:
         """エージェント間の相互作用を処理"""
         
+        # 意見タイプの集計は各処理で共有する
+        type_counts = Counter(op.opinion_type for op in opinions)
+        
         # 1. 対立レベルを分析
-        conflict_level = self.conflict_resolver.analyze_conflict_level(opinions)
+        conflict_level = self.conflict_resolver.analyze_conflict_level(opinions, type_counts)
         
         # 2. 対立解決策を提案
-        resolution = self.conflict_resolver.resolve_conflict(opinions, topic)
+        resolution = self.conflict_resolver.resolve_conflict(opinions, topic, type_counts)
         
         # 3. 合意形成を試行
-        consensus = self.consensus_builder.build_consensus(opinions, topic)
+        consensus = self.consensus_builder.build_consensus(opinions, topic, type_counts)
         
         # 4. 必要に応じて投票を実施
         voting_result = None
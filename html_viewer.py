@@ -3,89 +3,20 @@ HTMLビューアー - インテリジェント協調結果の可視化
 議論結果をHTML形式で美しく表示
 """
 
+import io
 import json
 import os
 from datetime import datetime
-from typing import Dict, List, Any, Optional
-from result_analyzer import ResultAnalyzer
-import argparse
+from typing import Dict, List, Any, Iterator, Optional, TextIO, Tuple
 from pathlib import Path
+from string import Template
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from urllib.parse import quote
 
 
-class HTMLViewer:
-    """HTML結果ビューアー"""
-    
-    def __init__(self):
-        self.analyzer = ResultAnalyzer()
-        self.template_dir = "html_templates"
-        self.output_dir = "html_reports"
-        os.makedirs(self.output_dir, exist_ok=True)
-    
-    def generate_session_report(self, session_id: str) -> str:
-        """セッションのHTML報告書を生成"""
-        
-        # セッション読み込み
-        session_data = self.analyzer.load_session(session_id)
-        if not session_data:
-            raise ValueError(f"セッション {session_id} が見つかりません")
-        
-        # 分析実行
-        analysis = self.analyzer.analyze_session(session_data)
-        
-        # HTML生成
-        html_content = self._generate_html_content(session_data, analysis)
-        
-        # ファイル保存
-        output_file = os.path.join(self.output_dir, f"session_{session_id}.html")
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write(html_content)
-        
-        return output_file
-    
-    def _generate_html_content(self, session_data: Dict[str, Any], analysis: Dict[str, Any]) -> str:
-        """HTML内容を生成"""
-        
-        session_info = session_data["session_info"]
-        agents = session_data["agents"]
-        discussion_rounds = session_data["discussion_rounds"]
-        final_conclusion = session_data["final_conclusion"]
-        
-        html = f"""
-<!DOCTYPE html>
-<html lang="ja">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>議論分析レポート - {session_info['topic']}</title>
-    <style>
-        {self._get_css_styles()}
-    </style>
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-</head>
-<body>
-    <div class="container">
-        {self._generate_header_section(session_info)}
-        {self._generate_summary_section(analysis['basic_stats'])}
-        {self._generate_agents_section(agents, analysis['agent_analysis'])}
-        {self._generate_rounds_section(discussion_rounds, analysis['round_analysis'])}
-        {self._generate_collaboration_section(analysis['collaboration_patterns'])}
-        {self._generate_evolution_section(analysis['opinion_evolution'])}
-        {self._generate_conclusion_section(final_conclusion)}
-        {self._generate_charts_section()}
-    </div>
-    
-    <script>
-        {self._generate_javascript()}
-    </script>
-</body>
-</html>
-        """
-        
-        return html
-    
-    def _get_css_styles(self) -> str:
-        """CSSスタイルを取得"""
-        return """
+# セッション報告書用CSS（全報告書で共通のためモジュール読み込み時に1度だけ構築）
+_CSS_STYLES = """
         * {
             margin: 0;
             padding: 0;
@@ -337,6 +268,300 @@ class HTMLViewer:
             }
         }
         """
+
+
+# 合意レベル（低・中・高）に対応するCSSクラス
+_CONSENSUS_CLASSES = ("consensus-low", "consensus-medium", "consensus-high")
+
+
+# HTMLエスケープ用の変換表（html.escapeと同じ5文字をC実装のstr.translateで一括置換）
+_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;"
+})
+
+
+def _esc(value: Any) -> str:
+    """ログ由来の値をHTMLに埋め込める形にエスケープ"""
+    return str(value).translate(_ESCAPE_TABLE)
+
+
+# 報告書・インデックスで共通のページ外枠（<head>と<body>のコンテナ開始・終了部分）
+_PAGE_OPEN = Template("""
+<!DOCTYPE html>
+<html lang="ja">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>$title</title>
+    <style>
+        $css
+    </style>$extra_head
+</head>
+<body>
+    <div class="container">
+        """)
+_PAGE_CLOSE = Template("""
+    </div>$extra_body
+</body>
+</html>
+        """)
+
+# Chart.jsの読み込み先（出力ディレクトリにchart.min.jsを置けばオフラインでも表示できる）
+_CHART_JS_CDN = "https://cdn.jsdelivr.net/npm/chart.js"
+_CHART_JS_LOCAL = "chart.min.js"
+
+# 合意度推移チャートのJavaScript（$labels / $data にラウンドごとの実データを埋め込む）
+_CHART_JS = Template("""
+        // Chart.jsはdeferで読み込むため、DOM構築完了後に描画する
+        document.addEventListener('DOMContentLoaded', () => {
+            // 合意度推移チャート
+            const ctx = document.getElementById('consensusChart').getContext('2d');
+            const chart = new Chart(ctx, {
+                type: 'line',
+                data: {
+                    labels: $labels,
+                    datasets: [{
+                        label: '合意度',
+                        data: $data,
+                        borderColor: '#3498db',
+                        backgroundColor: 'rgba(52, 152, 219, 0.1)',
+                        tension: 0.4,
+                        fill: true
+                    }]
+                },
+                options: {
+                    responsive: true,
+                    maintainAspectRatio: false,
+                    plugins: {
+                        title: {
+                            display: true,
+                            text: '合意度の推移'
+                        }
+                    },
+                    scales: {
+                        y: {
+                            beginAtZero: true,
+                            max: 1
+                        }
+                    }
+                }
+            });
+        });
+        """)
+
+
+# インデックスページ用CSS
+_INDEX_CSS = """
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            margin: 0;
+            padding: 20px;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            min-height: 100vh;
+        }
+        
+        .container {
+            max-width: 800px;
+            margin: 0 auto;
+            background: white;
+            border-radius: 15px;
+            overflow: hidden;
+            box-shadow: 0 0 30px rgba(0,0,0,0.1);
+        }
+        
+        .header {
+            background: linear-gradient(135deg, #2c3e50 0%, #3498db 100%);
+            color: white;
+            padding: 40px 30px;
+            text-align: center;
+        }
+        
+        .sessions-list {
+            padding: 30px;
+        }
+        
+        .session-item {
+            background: #f8f9fa;
+            border-radius: 10px;
+            padding: 20px;
+            margin: 15px 0;
+            border-left: 4px solid #3498db;
+            transition: box-shadow 0.3s ease;
+        }
+        
+        .session-item:hover {
+            box-shadow: 0 5px 15px rgba(0,0,0,0.1);
+        }
+        
+        .session-header {
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            margin-bottom: 10px;
+        }
+        
+        .session-info {
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+        }
+        
+        .view-button {
+            background: #3498db;
+            color: white;
+            padding: 8px 16px;
+            text-decoration: none;
+            border-radius: 5px;
+            transition: background 0.3s ease;
+        }
+        
+        .view-button:hover {
+            background: #2980b9;
+        }
+        """
+
+
+@lru_cache(maxsize=512)
+def _format_timestamp(iso_timestamp: str) -> str:
+    """ISO形式のタイムスタンプを表示用に整形（同じ値は再パースしない）"""
+    return datetime.fromisoformat(iso_timestamp).strftime('%Y年%m月%d日 %H:%M')
+
+
+def _interleave_sections(builders, separator: str) -> Iterator[str]:
+    """各セクションを必要になった時点で生成し、間に区切りを挟んで1つずつ返す"""
+    for i, build in enumerate(builders):
+        if i:
+            yield separator
+        yield build()
+
+
+class HTMLViewer:
+    """HTML結果ビューアー"""
+    
+    def __init__(self, output_dir: str = "html_reports"):
+        self._analyzer = None  # 初回アクセス時に生成（ライブラリ利用時の読み込みコスト削減）
+        self.template_dir = "html_templates"
+        self.output_dir = output_dir
+        # 出力先のPathは1度だけ作って各ファイルパスの組み立てに使い回す
+        self._output_path = Path(self.output_dir)
+        self._output_path.mkdir(parents=True, exist_ok=True)
+        # ローカルのChart.jsがあればそれを参照し、CDNへのアクセスを省く
+        if (self._output_path / _CHART_JS_LOCAL).exists():
+            self._chart_js_src = _CHART_JS_LOCAL
+        else:
+            self._chart_js_src = _CHART_JS_CDN
+        # session_id -> (ログのmtime, セッションデータ, 分析結果)
+        self._analysis_cache: Dict[str, Tuple[int, Dict[str, Any], Dict[str, Any]]] = {}
+    
+    @property
+    def analyzer(self):
+        """結果分析器（result_analyzerは必要になった時点で読み込む）"""
+        if self._analyzer is None:
+            from result_analyzer import ResultAnalyzer
+            self._analyzer = ResultAnalyzer()
+        return self._analyzer
+    
+    def generate_session_report(self, session_id: str, force: bool = False) -> str:
+        """セッションのHTML報告書を生成（既存の報告書がログより新しければ再生成しない。force=Trueで強制生成）"""
+        
+        output_file = self._report_path(session_id)
+        if not force and self._is_report_up_to_date(session_id, output_file):
+            return str(output_file)
+        
+        # セッション読み込み・分析（ログが更新されていなければキャッシュを再利用）
+        session_data, analysis = self._load_and_analyze(session_id)
+        
+        # HTML生成・保存（全体を1つの文字列に組み立てず、バッファ付きで順次書き出す）
+        tmp_file = output_file.with_name(output_file.name + ".tmp")
+        try:
+            with tmp_file.open("w", encoding="utf-8", buffering=1 << 20) as fh:
+                self._write_html_content(session_data, analysis, fh)
+            # 書き出しが完了してから置き換え、途中で失敗しても既存の報告書を壊さない
+            tmp_file.replace(output_file)
+        except Exception:
+            tmp_file.unlink(missing_ok=True)
+            raise
+        
+        return str(output_file)
+    
+    def _report_path(self, session_id: str) -> Path:
+        """セッションの報告書の出力先パス"""
+        return self._output_path / f"session_{session_id}.html"
+    
+    def _is_report_up_to_date(self, session_id: str, output_file: Path) -> bool:
+        """報告書のmtimeがセッションログのmtime以上かどうか（どちらかが無ければFalse）"""
+        try:
+            return output_file.stat().st_mtime >= os.stat(self.analyzer.session_path(session_id)).st_mtime
+        except OSError:
+            return False
+    
+    def _load_and_analyze(self, session_id: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """セッションを読み込んで分析（ログのmtimeをキーにメモ化）"""
+        try:
+            mtime = os.stat(self.analyzer.session_path(session_id)).st_mtime_ns
+        except OSError:
+            mtime = None
+        
+        cached = self._analysis_cache.get(session_id)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+        
+        session_data = self.analyzer.load_session(session_id)
+        if not session_data:
+            raise ValueError(f"セッション {session_id} が見つかりません")
+        
+        analysis = self.analyzer.analyze_session(session_data)
+        if mtime is not None:
+            self._analysis_cache[session_id] = (mtime, session_data, analysis)
+        
+        return session_data, analysis
+    
+    def _generate_html_content(self, session_data: Dict[str, Any], analysis: Dict[str, Any]) -> str:
+        """HTML内容を生成（文字列として取得する互換API）"""
+        buffer = io.StringIO()
+        self._write_html_content(session_data, analysis, buffer)
+        return buffer.getvalue()
+    
+    def _write_html_content(self, session_data: Dict[str, Any], analysis: Dict[str, Any], fh: TextIO):
+        """HTML内容を組み立ててファイルへ書き出す（ページ外枠の間に各セクションを順に書き出す）"""
+        
+        session_info = session_data["session_info"]
+        agents = session_data["agents"]
+        discussion_rounds = session_data["discussion_rounds"]
+        final_conclusion = session_data["final_conclusion"]
+        
+        # タイトルとヘッダーで使う文字列フィールドは先に1度だけエスケープしておく
+        safe_info = {k: _esc(v) if isinstance(v, str) else v for k, v in session_info.items()}
+        
+        write = fh.write
+        write(_PAGE_OPEN.substitute(
+            title=f"議論分析レポート - {safe_info['topic']}",
+            css=self._get_css_styles(),
+            extra_head=f'\n    <script defer src="{self._chart_js_src}"></script>'
+        ))
+        # 各セクションは生成した順に区切りを挟んでそのまま書き出す（本文全体を1つの文字列に連結しない）
+        section_builders = (
+            lambda: self._generate_header_section(safe_info),
+            lambda: self._generate_summary_section(analysis['basic_stats']),
+            lambda: self._generate_agents_section(agents, analysis['agent_analysis']),
+            lambda: self._generate_rounds_section(discussion_rounds, analysis['round_analysis']),
+            lambda: self._generate_collaboration_section(analysis['collaboration_patterns']),
+            lambda: self._generate_evolution_section(analysis['opinion_evolution']),
+            lambda: self._generate_conclusion_section(final_conclusion),
+            self._generate_charts_section,
+        )
+        fh.writelines(_interleave_sections(section_builders, "\n        "))
+        write(_PAGE_CLOSE.substitute(
+            extra_body=f"\n    \n    <script>\n        {self._generate_javascript(analysis['round_analysis'])}\n    </script>"
+        ))
+    
+    def _get_css_styles(self) -> str:
+        """CSSスタイルを取得"""
+        return _CSS_STYLES
     
     def _generate_header_section(self, session_info: Dict[str, Any]) -> str:
         """ヘッダーセクション生成"""
@@ -354,7 +579,7 @@ class HTMLViewer:
                 </div>
                 <div class="info-item">
                     <strong>実施日時</strong><br>
-                    {datetime.fromisoformat(session_info['timestamp']).strftime('%Y年%m月%d日 %H:%M')}
+                    {_format_timestamp(session_info['timestamp'])}
                 </div>
                 <div class="info-item">
                     <strong>ラウンド数</strong><br>
@@ -395,19 +620,24 @@ class HTMLViewer:
     def _generate_agents_section(self, agents: List[Dict[str, Any]], agent_analysis: Dict[str, Any]) -> str:
         """エージェントセクション生成"""
         
-        agents_html = ""
+        # 分析結果がなければカードの組み立て自体を省く
+        if not agents or not agent_analysis:
+            return self._generate_empty_section("👥 エージェント分析")
+        
+        agent_parts = []
         for agent in agents:
             name = agent['name']
-            if name in agent_analysis:
-                analysis = agent_analysis[name]
-                agents_html += f"""
+            # 1回の辞書参照で存在確認と取得を兼ねる
+            analysis = agent_analysis.get(name)
+            if analysis is not None:
+                agent_parts.append(f"""
                 <div class="agent-card">
                     <div class="agent-name">
-                        👤 {name}
-                        <span class="expertise-badge">{agent['expertise_area']}</span>
+                        👤 {_esc(name)}
+                        <span class="expertise-badge">{_esc(agent['expertise_area'])}</span>
                     </div>
                     <div style="color: #666; margin: 10px 0;">
-                        {agent['personality']}
+                        {_esc(agent['personality'])}
                     </div>
                     <div class="agent-metrics">
                         <div class="metric">
@@ -428,7 +658,8 @@ class HTMLViewer:
                         </div>
                     </div>
                 </div>
-                """
+                """)
+        agents_html = "".join(agent_parts)
         
         return f"""
         <div class="section">
@@ -442,28 +673,33 @@ class HTMLViewer:
     def _generate_rounds_section(self, discussion_rounds: List[Dict[str, Any]], round_analysis: List[Dict[str, Any]]) -> str:
         """ラウンドセクション生成"""
         
-        rounds_html = ""
-        for i, (round_data, analysis) in enumerate(zip(discussion_rounds, round_analysis)):
+        round_parts = []
+        for round_data, analysis in zip(discussion_rounds, round_analysis):
             round_num = round_data['round_number']
+            # ループ内で使う値は1度だけ取り出してローカル変数で参照する
+            opinion_distribution = analysis['opinion_distribution']
+            collab = analysis['collaboration_metrics']
+            average_confidence = analysis['average_confidence']
+            evidence_usage_rate = analysis['evidence_usage_rate']
             
             # 意見分布の表示
-            opinion_dist = ""
-            if analysis['opinion_distribution']:
-                for opinion, count in analysis['opinion_distribution'].items():
-                    opinion_dist += f'<div class="opinion-count"><strong>{count}</strong> {opinion}</div>'
+            opinion_dist = "".join(
+                f'<div class="opinion-count"><strong>{count}</strong> {_esc(opinion)}</div>'
+                for opinion, count in opinion_distribution.items()
+            ) if opinion_distribution else ""
             
             # コラボレーション情報
             collab_info = ""
-            if analysis['collaboration_metrics']:
-                collab = analysis['collaboration_metrics']
+            if collab:
                 consensus_level = collab.get('consensus_level', 0)
+                conflict_level = collab.get('conflict_level', 'N/A')
                 progress_class = self._get_consensus_class(consensus_level)
                 
                 collab_info = f"""
                 <div style="margin: 15px 0;">
                     <div style="display: flex; justify-content: space-between;">
                         <span>合意度: {consensus_level:.2f}</span>
-                        <span>対立レベル: {collab.get('conflict_level', 'N/A')}</span>
+                        <span>対立レベル: {_esc(conflict_level)}</span>
                     </div>
                     <div class="progress-bar">
                         <div class="progress-fill {progress_class}" style="width: {consensus_level * 100}%"></div>
@@ -471,11 +707,11 @@ class HTMLViewer:
                 </div>
                 """
             
-            rounds_html += f"""
+            round_parts.append(f"""
             <div class="round-item">
                 <div class="round-header">
                     <span class="round-number">ラウンド {round_num}</span>
-                    <span>平均信頼度: {analysis['average_confidence']:.2f}</span>
+                    <span>平均信頼度: {average_confidence:.2f}</span>
                 </div>
                 
                 <div class="opinion-distribution">
@@ -485,10 +721,11 @@ class HTMLViewer:
                 {collab_info}
                 
                 <div style="margin-top: 15px;">
-                    <strong>証拠使用率:</strong> {analysis['evidence_usage_rate']:.2f}
+                    <strong>証拠使用率:</strong> {evidence_usage_rate:.2f}
                 </div>
             </div>
-            """
+            """)
+        rounds_html = "".join(round_parts)
         
         return f"""
         <div class="section">
@@ -523,7 +760,7 @@ class HTMLViewer:
             <h2>🤝 協調パターン分析</h2>
             <div class="stats-grid">
                 <div class="stat-card">
-                    <span class="stat-value">{trend_emoji}</span>
+                    <span class="stat-value">{_esc(trend_emoji)}</span>
                     <div class="stat-label">合意の傾向</div>
                 </div>
                 <div class="stat-card">
@@ -531,7 +768,7 @@ class HTMLViewer:
                     <div class="stat-label">最終合意度</div>
                 </div>
                 <div class="stat-card" style="background-color: {effectiveness_color}; color: white;">
-                    <span class="stat-value" style="color: white;">{effectiveness}</span>
+                    <span class="stat-value" style="color: white;">{_esc(effectiveness)}</span>
                     <div class="stat-label" style="color: rgba(255,255,255,0.8);">協調効果</div>
                 </div>
             </div>
@@ -545,29 +782,34 @@ class HTMLViewer:
     def _generate_evolution_section(self, opinion_evolution: Dict[str, Any]) -> str:
         """意見進化セクション生成"""
         
-        patterns_html = ""
-        if 'evolution_patterns' in opinion_evolution:
-            for agent_name, pattern_data in opinion_evolution['evolution_patterns'].items():
-                pattern_emoji = {
-                    'consistent': '🎯',
-                    'slight_shift': '🔄',
-                    'major_shift': '🔀'
-                }.get(pattern_data['pattern'], '❓')
-                
-                confidence_change = pattern_data['confidence_change']
-                confidence_direction = '⬆️' if confidence_change > 0 else ('⬇️' if confidence_change < 0 else '➡️')
-                
-                patterns_html += f"""
+        # 2ラウンド以上発言したエージェントがいなければ進化パターンは算出されない
+        evolution_patterns = opinion_evolution.get('evolution_patterns')
+        if not evolution_patterns:
+            return self._generate_empty_section("🔄 意見進化分析")
+        
+        pattern_parts = []
+        for agent_name, pattern_data in evolution_patterns.items():
+            pattern_emoji = {
+                'consistent': '🎯',
+                'slight_shift': '🔄',
+                'major_shift': '🔀'
+            }.get(pattern_data['pattern'], '❓')
+            
+            confidence_change = pattern_data['confidence_change']
+            confidence_direction = '⬆️' if confidence_change > 0 else ('⬇️' if confidence_change < 0 else '➡️')
+            
+            pattern_parts.append(f"""
                 <div class="agent-card">
-                    <div class="agent-name">{pattern_emoji} {agent_name}</div>
+                    <div class="agent-name">{pattern_emoji} {_esc(agent_name)}</div>
                     <div style="margin: 10px 0;">
-                        <strong>変化パターン:</strong> {pattern_data['pattern']}<br>
-                        <strong>初期意見:</strong> {pattern_data['initial_opinion']} → 
-                        <strong>最終意見:</strong> {pattern_data['final_opinion']}<br>
+                        <strong>変化パターン:</strong> {_esc(pattern_data['pattern'])}<br>
+                        <strong>初期意見:</strong> {_esc(pattern_data['initial_opinion'])} → 
+                        <strong>最終意見:</strong> {_esc(pattern_data['final_opinion'])}<br>
                         <strong>信頼度変化:</strong> {confidence_direction} {confidence_change:+.2f}
                     </div>
                 </div>
-                """
+                """)
+        patterns_html = "".join(pattern_parts)
         
         return f"""
         <div class="section">
@@ -585,28 +827,32 @@ class HTMLViewer:
         </div>
         """
     
+    def _generate_empty_section(self, title: str) -> str:
+        """データのないセクションのプレースホルダーを生成"""
+        return f"""
+        <div class="section">
+            <h2>{title}</h2>
+            <p>データなし</p>
+        </div>
+        """
+    
     def _generate_conclusion_section(self, final_conclusion: Dict[str, Any]) -> str:
         """結論セクション生成"""
         
-        agreed_points = ""
-        for point in final_conclusion.get('agreed_points', []):
-            agreed_points += f"<li>✅ {point}</li>"
-        
-        disagreed_points = ""
-        for point in final_conclusion.get('disagreed_points', []):
-            disagreed_points += f"<li>❌ {point}</li>"
+        agreed_points = "".join(f"<li>✅ {_esc(point)}</li>" for point in final_conclusion.get('agreed_points', []))
+        disagreed_points = "".join(f"<li>❌ {_esc(point)}</li>" for point in final_conclusion.get('disagreed_points', []))
         
         return f"""
         <div class="conclusion-section">
             <h2 style="color: white; border-left: 5px solid white;">🎯 最終結論</h2>
             
             <div class="conclusion-text">
-                {final_conclusion['conclusion_text']}
+                {_esc(final_conclusion['conclusion_text'])}
             </div>
             
             <div class="recommendation">
                 <h3 style="color: white; margin-bottom: 10px;">💡 推奨事項</h3>
-                <p style="font-size: 1.1em;">{final_conclusion['recommendation']}</p>
+                <p style="font-size: 1.1em;">{_esc(final_conclusion['recommendation'])}</p>
             </div>
             
             <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 20px; margin-top: 30px;">
@@ -630,181 +876,156 @@ class HTMLViewer:
         """チャートセクション生成"""
         return ""
     
-    def _generate_javascript(self) -> str:
-        """JavaScript生成"""
-        return """
-        // 合意度推移チャート
-        const ctx = document.getElementById('consensusChart').getContext('2d');
-        const chart = new Chart(ctx, {
-            type: 'line',
-            data: {
-                labels: ['ラウンド1', 'ラウンド2', 'ラウンド3'],
-                datasets: [{
-                    label: '合意度',
-                    data: [0.3, 0.6, 0.8],
-                    borderColor: '#3498db',
-                    backgroundColor: 'rgba(52, 152, 219, 0.1)',
-                    tension: 0.4,
-                    fill: true
-                }]
-            },
-            options: {
-                responsive: true,
-                maintainAspectRatio: false,
-                plugins: {
-                    title: {
-                        display: true,
-                        text: '合意度の推移'
-                    }
-                },
-                scales: {
-                    y: {
-                        beginAtZero: true,
-                        max: 1
-                    }
-                }
-            }
-        });
-        """
+    def _generate_javascript(self, round_analysis: List[Dict[str, Any]]) -> str:
+        """JavaScript生成（ラウンド別分析の合意度をチャートデータとして埋め込む）"""
+        labels = [f"ラウンド{r['round_number']}" for r in round_analysis]
+        # 協調分析のないラウンドはnull（チャート上は欠損）とする
+        data = [r['collaboration_metrics'].get('consensus_level') for r in round_analysis]
+        
+        return _CHART_JS.substitute(
+            labels=json.dumps(labels, ensure_ascii=False, separators=(',', ':')),
+            data=json.dumps(data, separators=(',', ':'))
+        )
     
     def _get_consensus_class(self, level: float) -> str:
         """合意レベルに応じたCSSクラスを取得"""
-        if level >= 0.7:
-            return "consensus-high"
-        elif level >= 0.4:
-            return "consensus-medium"
-        else:
-            return "consensus-low"
+        # 0.4以上・0.7以上を満たす数がそのままクラスの添字になる
+        return _CONSENSUS_CLASSES[(level >= 0.4) + (level >= 0.7)]
     
-    def generate_index_page(self) -> str:
-        """インデックスページ生成"""
-        sessions = self.analyzer.list_available_sessions()
+    def generate_index_page(self, sessions: Optional[List[Dict[str, str]]] = None) -> str:
+        """インデックスページ生成（取得済みのセッション一覧があれば再走査せずに使う）"""
+        if sessions is None:
+            sessions = self.analyzer.list_available_sessions()
         
-        sessions_html = ""
+        session_parts = []
         for session in sessions:
-            sessions_html += f"""
+            session_id = _esc(session['session_id'])
+            # リンク先のファイル名はURLとしてエンコードしてから属性値用にエスケープ
+            session_href = _esc(quote(f"session_{session['session_id']}.html"))
+            session_parts.append(f"""
             <div class="session-item">
                 <div class="session-header">
-                    <h3>{session['session_id']}</h3>
+                    <h3>{session_id}</h3>
                     <span class="session-date">{session['created_time']}</span>
                 </div>
                 <div class="session-info">
                     <span>サイズ: {session['file_size']}</span>
-                    <a href="session_{session['session_id']}.html" class="view-button">詳細を見る</a>
+                    <a href="{session_href}" class="view-button">詳細を見る</a>
                 </div>
             </div>
-            """
+            """)
+        sessions_html = "".join(session_parts)
         
-        html = f"""
-<!DOCTYPE html>
-<html lang="ja">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>議論セッション一覧</title>
-    <style>
-        {self._get_index_css()}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
+        body = f"""<div class="header">
             <h1>🗂️ 議論セッション一覧</h1>
             <p>インテリジェント協調システムの実行結果</p>
         </div>
         
         <div class="sessions-list">
             {sessions_html if sessions_html else "<p>まだセッションがありません。main_intelligent_collaboration.py を実行してセッションを作成してください。</p>"}
-        </div>
-    </div>
-</body>
-</html>
-        """
+        </div>"""
+        
+        html = "".join((
+            _PAGE_OPEN.substitute(title="議論セッション一覧", css=self._get_index_css(), extra_head=""),
+            body,
+            _PAGE_CLOSE.substitute(extra_body="")
+        ))
         
-        index_file = os.path.join(self.output_dir, "index.html")
-        with open(index_file, "w", encoding="utf-8") as f:
-            f.write(html)
+        index_file = self._output_path / "index.html"
+        index_file.write_text(html, encoding="utf-8")
         
-        return index_file
+        return str(index_file)
     
     def _get_index_css(self) -> str:
         """インデックスページ用CSS"""
-        return """
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-        }
-        
-        .container {
-            max-width: 800px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 15px;
-            overflow: hidden;
-            box-shadow: 0 0 30px rgba(0,0,0,0.1);
-        }
-        
-        .header {
-            background: linear-gradient(135deg, #2c3e50 0%, #3498db 100%);
-            color: white;
-            padding: 40px 30px;
-            text-align: center;
-        }
-        
-        .sessions-list {
-            padding: 30px;
-        }
-        
-        .session-item {
-            background: #f8f9fa;
-            border-radius: 10px;
-            padding: 20px;
-            margin: 15px 0;
-            border-left: 4px solid #3498db;
-            transition: box-shadow 0.3s ease;
-        }
-        
-        .session-item:hover {
-            box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-        }
-        
-        .session-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 10px;
-        }
-        
-        .session-info {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
-        
-        .view-button {
-            background: #3498db;
-            color: white;
-            padding: 8px 16px;
-            text-decoration: none;
-            border-radius: 5px;
-            transition: background 0.3s ease;
-        }
-        
-        .view-button:hover {
-            background: #2980b9;
-        }
-        """
+        return _INDEX_CSS
+
+
+def _render_one(session_id: str, output_dir: str, force: bool = False):
+    """1セッションの報告書を生成（ワーカープロセスから呼ぶため独自のHTMLViewerを作る）
+
+    (session_id, 出力ファイル, 例外, 最新のため生成を省いたか) を返す。失敗時は出力ファイルがNone。
+    """
+    try:
+        viewer = HTMLViewer(output_dir)
+        output_file = viewer._report_path(session_id)
+        if not force and viewer._is_report_up_to_date(session_id, output_file):
+            return session_id, str(output_file), None, True
+        return session_id, viewer.generate_session_report(session_id, force=True), None, False
+    except Exception as e:
+        return session_id, None, e, False
+
+
+def _generate_reports(viewer: HTMLViewer, session_ids: List[str], force: bool = False):
+    """複数セッションの報告書をプロセスプールで並行生成（描画はCPU処理のためGILを避ける）
+
+    入力順に (session_id, 出力ファイル, 例外, 生成を省いたか) を返す。
+    """
+    if not session_ids:
+        return []
+    
+    # 1件だけならプロセス起動のコストをかけずにその場で生成
+    if len(session_ids) == 1:
+        return [_render_one(session_ids[0], viewer.output_dir, force)]
+    
+    n = len(session_ids)
+    chunksize = max(1, n // ((os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, n)) as executor:
+        return list(executor.map(_render_one, session_ids, [viewer.output_dir] * n, [force] * n,
+                                 chunksize=chunksize))
+
+
+def _run_reports(viewer: HTMLViewer, session_ids: List[str], sessions: List[Dict[str, Any]],
+                 with_index: bool, force: bool = False) -> Tuple[int, int]:
+    """報告書をまとめて並行生成して結果を表示し、必要ならインデックスページも生成
+
+    (生成した件数, 最新のためスキップした件数) を返す。
+    """
+    generated = skipped_count = 0
+    for session_id, output_file, error, skipped in _generate_reports(viewer, session_ids, force=force):
+        if error is not None:
+            print(f"❌ {session_id} でエラー: {error}")
+        elif skipped:
+            skipped_count += 1
+            print(f"⏭️ {session_id} は最新のためスキップ → {output_file}（再生成は --force）")
+        else:
+            generated += 1
+            print(f"✅ {session_id} → {output_file}")
+    
+    if with_index:
+        index_file = viewer.generate_index_page(sessions)
+        print(f"📄 インデックスページ: {index_file}")
+    
+    return generated, skipped_count
+
+
+def _dispatch(choice: int, sessions: List[Dict[str, Any]], viewer: HTMLViewer, force: bool = False) -> bool:
+    """インタラクティブモードの選択番号を作業リストに変換して実行（無効な番号ならFalse）"""
+    n = len(sessions)
+    if 1 <= choice <= n:
+        session_ids, with_index = [sessions[choice - 1]['session_id']], False
+    elif choice == n + 1:
+        # 全セッション
+        session_ids, with_index = [s['session_id'] for s in sessions], True
+    elif choice == n + 2:
+        # インデックスのみ
+        session_ids, with_index = [], True
+    else:
+        return False
+    
+    _run_reports(viewer, session_ids, sessions, with_index, force)
+    return True
 
 
 def main():
     """メイン実行関数"""
+    import argparse
+    
     parser = argparse.ArgumentParser(description="HTML報告書ジェネレーター")
     parser.add_argument("--session", type=str, help="生成するセッションID")
     parser.add_argument("--index", action="store_true", help="インデックスページを生成")
     parser.add_argument("--all", action="store_true", help="全セッションの報告書を生成")
+    parser.add_argument("--force", action="store_true", help="最新の報告書があっても再生成")
     
     args = parser.parse_args()
     
@@ -818,8 +1039,7 @@ def main():
     
     if args.all:
         # 全セッション処理
-        analyzer = ResultAnalyzer()
-        sessions = analyzer.list_available_sessions()
+        sessions = viewer.analyzer.list_available_sessions()
         
         if not sessions:
             print("📂 セッションが見つかりませんでした。")
@@ -827,31 +1047,25 @@ def main():
         
         print(f"🔄 {len(sessions)}個のセッションを処理中...")
         
-        for session in sessions:
-            try:
-                output_file = viewer.generate_session_report(session['session_id'])
-                print(f"✅ {session['session_id']} → {output_file}")
-            except Exception as e:
-                print(f"❌ {session['session_id']} でエラー: {e}")
-        
-        # インデックスページも生成
-        index_file = viewer.generate_index_page()
-        print(f"📄 インデックスページ: {index_file}")
-        print(f"🎉 全ての報告書が {viewer.output_dir} に生成されました！")
+        generated, skipped = _run_reports(viewer, [s['session_id'] for s in sessions], sessions, True, args.force)
+        if generated:
+            scope = f"{generated}件の報告書" if skipped else "全ての報告書"
+            print(f"🎉 {scope}が {viewer.output_dir} に生成されました！")
+        if skipped:
+            print(f"⏭️ {skipped}件の報告書は最新のためスキップしました（再生成は --force）")
         return
     
     if args.session:
         # 特定セッション処理
         try:
-            output_file = viewer.generate_session_report(args.session)
+            output_file = viewer.generate_session_report(args.session, force=args.force)
             print(f"✅ HTML報告書を生成しました: {output_file}")
         except Exception as e:
             print(f"❌ エラーが発生しました: {e}")
         return
     
     # インタラクティブモード
-    analyzer = ResultAnalyzer()
-    sessions = analyzer.list_available_sessions()
+    sessions = viewer.analyzer.list_available_sessions()
     
     if not sessions:
         print("📂 セッションが見つかりませんでした。")
@@ -867,32 +1081,13 @@ def main():
     
     try:
         choice = int(input("\n生成したい番号を選択してください: "))
-        
-        if 1 <= choice <= len(sessions):
-            session_id = sessions[choice - 1]['session_id']
-            output_file = viewer.generate_session_report(session_id)
-            print(f"✅ HTML報告書を生成しました: {output_file}")
-        elif choice == len(sessions) + 1:
-            # 全セッション
-            for session in sessions:
-                try:
-                    output_file = viewer.generate_session_report(session['session_id'])
-                    print(f"✅ {session['session_id']} → {output_file}")
-                except Exception as e:
-                    print(f"❌ {session['session_id']} でエラー: {e}")
-            
-            index_file = viewer.generate_index_page()
-            print(f"📄 インデックスページ: {index_file}")
-        elif choice == len(sessions) + 2:
-            # インデックスのみ
-            index_file = viewer.generate_index_page()
-            print(f"📄 インデックスページを生成しました: {index_file}")
-        else:
-            print("❌ 無効な選択です。")
-    
     except ValueError:
         print("❌ 無効な入力です。")
+        return
+    
+    if not _dispatch(choice, sessions, viewer, args.force):
+        print("❌ 無効な選択です。")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,21 @@
+"""
+HTTPクライアント共通設定
+OpenAIクライアントに渡すhttpxクライアントの設定を一元管理
+"""
+
+import importlib.util
+
+
+def http_client_options(httpx, read_timeout: float = 30.0, connect_timeout: float = 3.0,
+                        max_connections: int = 100, max_keepalive_connections: int = 8) -> dict:
+    """httpxクライアントの共通設定（並行度に応じてタイムアウトと接続数を指定できる）"""
+    return {
+        # 接続は短く、生成待ちの読み取りは長めに
+        "timeout": httpx.Timeout(read_timeout, connect=connect_timeout),
+        # 呼び出しの合間にアイドルになっても接続を閉じず、TLSハンドシェイクを繰り返さない
+        "limits": httpx.Limits(max_connections=max_connections,
+                               max_keepalive_connections=max_keepalive_connections,
+                               keepalive_expiry=120),
+        # HTTP/2はh2パッケージがある場合のみ有効化
+        "http2": importlib.util.find_spec("h2") is not None,
+    }
@@ -5,25 +5,121 @@ AutoGenを使わずにシンプルに実装
 
 import os
 import sys
+import threading
 from datetime import datetime
 import json
 
-def call_openai_api(messages, system_message="", model="gpt-3.5-turbo"):
-    """OpenAI APIを直接呼び出し"""
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from http_client import http_client_options
+
+# 全エージェント呼び出しで共有するOpenAIクライアント（接続を使い回す）
+_client = None
+# クライアント生成を1度だけに限るためのロック（並行実行時の二重生成を防ぐ）
+_client_lock = threading.Lock()
+
+
+def _get_openai_client():
+    """共有OpenAIクライアントを取得（初回呼び出し時に生成）"""
+    global _client
+    if _client is not None:
+        return _client
+    
+    with _client_lock:
+        if _client is None:
+            import openai
+            import httpx
+            
+            options = http_client_options(httpx)
+            _client = openai.OpenAI(
+                api_key=os.environ.get("OPENAI_API_KEY"),
+                max_retries=2,
+                timeout=options["timeout"],
+                http_client=httpx.Client(**options)
+            )
+    return _client
+
+
+def _create_async_openai_client():
+    """AsyncOpenAIクライアントを生成
+
+    接続プールは生成時のイベントループに紐づくため共有せず、バッチ実行ごとに生成して閉じる
+    """
+    import openai
+    import httpx
+    
+    options = http_client_options(httpx)
+    return openai.AsyncOpenAI(
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        max_retries=2,
+        timeout=options["timeout"],
+        http_client=httpx.AsyncClient(**options)
+    )
+
+
+def _build_messages(messages, system_message=""):
+    """システムメッセージを先頭に付けたメッセージリストを作成"""
+    full_messages = []
+    if system_message:
+        full_messages.append({"role": "system", "content": system_message})
+    full_messages.extend(messages)
+    return full_messages
+
+
+def call_openai_api(messages, system_message="", model="gpt-3.5-turbo", stream=False):
+    """OpenAI APIを直接呼び出し（stream=Trueなら生成された断片を順に返すジェネレーターを返す）"""
+    if stream:
+        return _stream_openai_api(messages, system_message, model)
+    
     try:
-        import openai
+        client = _get_openai_client()
+        
+        response = client.chat.completions.create(
+            model=model,
+            messages=_build_messages(messages, system_message),
+            temperature=0.7,
+            max_tokens=500
+        )
         
-        client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        return response.choices[0].message.content
         
-        # システムメッセージを追加
-        full_messages = []
-        if system_message:
-            full_messages.append({"role": "system", "content": system_message})
-        full_messages.extend(messages)
+    except Exception as e:
+        return f"APIエラー: {e}"
+
+
+def _stream_openai_api(messages, system_message, model):
+    """OpenAI APIをストリーミングで呼び出し、本文の断片を届いた順にyield"""
+    try:
+        client = _get_openai_client()
         
         response = client.chat.completions.create(
             model=model,
-            messages=full_messages,
+            messages=_build_messages(messages, system_message),
+            temperature=0.7,
+            max_tokens=500,
+            stream=True
+        )
+        
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                yield content
+        
+    except Exception as e:
+        yield f"APIエラー: {e}"
+
+
+async def _acall_openai_api(client, messages, system_message="", model="gpt-3.5-turbo"):
+    """OpenAI APIを非同期で呼び出し（clientは呼び出し側のイベントループで生成したもの）"""
+    try:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=_build_messages(messages, system_message),
             temperature=0.7,
             max_tokens=500
         )
@@ -34,35 +130,51 @@ def call_openai_api(messages, system_message="", model="gpt-3.5-turbo"):
         return f"APIエラー: {e}"
 
 
+# 発言ごとの区切り線
+_SEP = "-" * 50
+
+# コンソール出力テンプレート（固定部分は読み込み時に確定し、実行時は可変部分のみ埋め込む）
+_BANNER_TEMPLATE = "\n=== 多エージェント対話システム（直接API版） ===\nユーザー入力: {user_input}\n\n"
+_TURN_HEADER_TEMPLATE = "\n[{agent_name}の発言]\n"
+_TURN_FOOTER = "\n" + _SEP + "\n"
+_FOOTER = "\n=== 対話完了 ===\n"
+
+# エージェント名とシステムメッセージの組（発言順。モジュール読み込み時に1度だけ構築）
+_AGENTS = (
+    ("語り手", "あなたは創造的な語り手です。大胆で自由な発想で意見を述べ、時には想像力豊かで大げさな表現も使ってください。ハルシネーションも恐れずに、議論の方向性を示してください。"),
+    
+    ("相槌役", "あなたは慎重な相槌役です。語り手の発言を注意深く聞き、内容を確認してください。良い点は積極的に同意し、問題がある点は建設的に指摘してください。必要に応じて「それは面白い視点ですが、実際には...」のような形で修正を提案してください。"),
+    
+    ("判定役", "あなたは公平な判定役です。これまでの議論を整理し、バランスの取れた結論を導いてください。語り手と相槌役の意見を両方考慮し、最終的な結論と代替案を1-2個提示してください。最後に必ず「以上で議論を終了します」と明記してください。")
+)
+
+
 def run_multi_agent_conversation(user_input: str):
     """3つのエージェントによる順次対話を実行"""
     
-    print(f"\n=== 多エージェント対話システム（直接API版） ===")
-    print(f"ユーザー入力: {user_input}\n")
-    
-    # エージェントのシステムメッセージ
-    agents = {
-        "語り手": "あなたは創造的な語り手です。大胆で自由な発想で意見を述べ、時には想像力豊かで大げさな表現も使ってください。ハルシネーションも恐れずに、議論の方向性を示してください。",
-        
-        "相槌役": "あなたは慎重な相槌役です。語り手の発言を注意深く聞き、内容を確認してください。良い点は積極的に同意し、問題がある点は建設的に指摘してください。必要に応じて「それは面白い視点ですが、実際には...」のような形で修正を提案してください。",
-        
-        "判定役": "あなたは公平な判定役です。これまでの議論を整理し、バランスの取れた結論を導いてください。語り手と相槌役の意見を両方考慮し、最終的な結論と代替案を1-2個提示してください。最後に必ず「以上で議論を終了します」と明記してください。"
-    }
+    write = sys.stdout.write
+    write(_BANNER_TEMPLATE.format(user_input=user_input))
     
     # 対話履歴
     conversation_history = [{"role": "user", "content": user_input}]
     responses = {}
     
     # 各エージェントが順番に発言
-    for agent_name, system_msg in agents.items():
-        print(f"\n[{agent_name}の発言]")
+    for agent_name, system_msg in _AGENTS:
+        # API待ちの間も誰の発言か分かるよう見出しは先に出力する
+        write(_TURN_HEADER_TEMPLATE.format(agent_name=agent_name))
+        sys.stdout.flush()
         
-        # APIを呼び出し
-        response = call_openai_api(conversation_history, system_msg)
+        # APIをストリーミングで呼び出し、届いた断片から順に表示する
+        parts = []
+        for piece in call_openai_api(conversation_history, system_msg, stream=True):
+            parts.append(piece)
+            write(piece)
+            sys.stdout.flush()
+        response = "".join(parts)
         responses[agent_name] = response
         
-        print(response)
-        print("-" * 50)
+        write(_TURN_FOOTER)
         
         # 履歴に追加
         conversation_history.append({
@@ -77,27 +189,107 @@ def run_multi_agent_conversation(user_input: str):
     # ログ保存
     save_conversation_log(user_input, responses)
     
-    print("\n=== 対話完了 ===")
+    write(_FOOTER)
+    sys.stdout.flush()
 
 
-def save_conversation_log(user_input: str, responses: dict):
-    """対話ログをJSON形式で保存"""
-    log_dir = "conversation_logs"
-    os.makedirs(log_dir, exist_ok=True)
+async def _run_batch(topics):
+    """エージェントごとに全トピック分の呼び出しをまとめて並行実行"""
+    import asyncio
     
-    session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = os.path.join(log_dir, f"direct_session_{session_id}.json")
+    histories = [[{"role": "user", "content": topic}] for topic in topics]
+    results = [{} for _ in topics]
+    
+    # クライアントはこのイベントループ専用に生成し、終了時に接続プールごと閉じる
+    client = _create_async_openai_client()
+    try:
+        # 各トピック内の発言順は守り、同じ役割の呼び出しだけを同時に投げる
+        for agent_name, system_msg in _AGENTS:
+            replies = await asyncio.gather(*(
+                _acall_openai_api(client, history, system_msg) for history in histories
+            ))
+            for history, responses, reply in zip(histories, results, replies):
+                responses[agent_name] = reply
+                history.append({"role": "assistant", "content": f"{agent_name}: {reply}"})
+    finally:
+        await client.close()
+    
+    return results
+
+
+def run_multi_agent_batch(topics: list) -> list:
+    """複数トピックの対話をまとめて実行し、トピックごとの発言辞書を返す"""
+    import asyncio
     
+    results = asyncio.run(_run_batch(topics))
+    
+    write = sys.stdout.write
+    # 同じ秒に保存してもファイル名が衝突しないよう連番を付ける
+    batch_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    for i, (user_input, responses) in enumerate(zip(topics, results), 1):
+        write(_BANNER_TEMPLATE.format(user_input=user_input))
+        for agent_name, response in responses.items():
+            write(_TURN_HEADER_TEMPLATE.format(agent_name=agent_name))
+            write(response)
+            write(_TURN_FOOTER)
+        save_conversation_log(user_input, responses, session_id=f"{batch_id}_{i}")
+        write(_FOOTER)
+    sys.stdout.flush()
+    
+    return results
+
+
+# ログ出力先（作成済みかどうかをプロセス内で記憶し、mkdirは初回のみ行う）
+_LOG_DIR = "conversation_logs"
+_log_dir_ready = False
+
+
+def _ensure_log_dir() -> str:
+    """ログディレクトリを必要時に1度だけ作成"""
+    global _log_dir_ready
+    if not _log_dir_ready:
+        os.makedirs(_LOG_DIR, exist_ok=True)
+        _log_dir_ready = True
+    return _LOG_DIR
+
+
+def save_conversation_log(user_input: str, responses: dict, pretty: bool = False, session_id: str = None):
+    """対話ログをJSON形式で保存（既定はツール向けのコンパクト形式、pretty=Trueで整形出力）"""
+    log_dir = _ensure_log_dir()
+    
+    # 現在時刻は1回だけ取得し、セッションIDとタイムスタンプで共有
+    now = datetime.now()
+    if session_id is None:
+        session_id = now.strftime("%Y%m%d_%H%M%S")
+    log_file = os.path.join(log_dir, f"direct_session_{session_id}.json")
+
     log_data = {
         "session_id": session_id,
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now.isoformat(),
         "mode": "direct_openai_api",
         "user_input": user_input,
         "responses": responses
     }
     
-    with open(log_file, "w", encoding="utf-8") as f:
-        json.dump(log_data, f, ensure_ascii=False, indent=2)
+    if orjson is not None:
+        # orjsonはUTF-8のバイト列を直接返すためエンコードも不要
+        buf = orjson.dumps(log_data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    elif pretty:
+        buf = json.dumps(log_data, ensure_ascii=False, indent=2).encode("utf-8")
+    else:
+        # ログは循環参照を含まないため循環チェックも省略
+        buf = json.dumps(log_data, ensure_ascii=False, separators=(",", ":"), check_circular=False).encode("utf-8")
+    
+    # シリアライズ済みのバイト列を1回のwriteで書き込む
+    # open()と同じく0o666からumaskを差し引いた権限で作成
+    fd = os.open(log_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        view = memoryview(buf)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+    finally:
+        os.close(fd)
     
     print(f"\n対話ログを保存しました: {log_file}")
 
@@ -118,6 +310,13 @@ def main():
         print("例: OPENAI_API_KEY=sk-...")
         return
     
+    # バッチ実行（1行1トピックのファイルを指定）
+    if len(sys.argv) == 3 and sys.argv[1] == "--batch":
+        with open(sys.argv[2], encoding="utf-8") as f:
+            topics = [line.strip() for line in f if line.strip()]
+        run_multi_agent_batch(topics)
+        return
+    
     # 入力取得
     if len(sys.argv) > 1:
         user_input = " ".join(sys.argv[1:])
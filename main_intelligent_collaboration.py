@@ -3,12 +3,16 @@
 動的エージェント生成 + 高度な協調機能を統合
 """
 
+import asyncio
 import os
 import sys
 import json
+import math
+from collections.abc import Mapping
+from dataclasses import fields, is_dataclass
 from datetime import datetime
+from enum import Enum
 from typing import Dict, List, Any, Optional
-import openai
 
 # 新機能モジュールのインポート
 from agent_factory import AgentFactory, AgentProfile, ExpertiseArea
@@ -18,6 +22,114 @@ from collaboration_system import (
 )
 from web_search_agent import WebSearchAgent, FactChecker, TrendAnalyzer
 from mcp_integration import RealMCPIntegration
+from http_client import http_client_options
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# 発言ごとの区切り線
+_SEP = "-" * 50
+
+# API呼び出しの同時実行数の既定値
+_DEFAULT_LLM_CONCURRENCY = 6
+
+# 意見タイプ判定のキーワード（上から順に判定し、最初に該当したタイプを採用）
+_OPINION_KEYWORDS = (
+    (OpinionType.STRONGLY_AGREE, frozenset(("強く賛成", "完全に同意", "絶対に"))),
+    (OpinionType.AGREE, frozenset(("賛成", "同意", "良い", "正しい"))),
+    (OpinionType.DISAGREE, frozenset(("反対", "異議", "問題", "懸念"))),
+    (OpinionType.STRONGLY_DISAGREE, frozenset(("強く反対", "完全に反対", "絶対に反対"))),
+)
+# 信頼度を上げるキーワード（出現した種類数で加算）
+_CONFIDENCE_KEYWORDS = frozenset(("確信", "明確", "間違いなく", "確実", "データ"))
+# エビデンス種別とその手がかりとなるキーワード
+_EVIDENCE_KEYWORDS = (
+    ("研究・データ", frozenset(("研究", "データ"))),
+    ("経験・実例", frozenset(("経験", "実例"))),
+    ("理論", frozenset(("理論",))),
+)
+
+
+# 埋め込みによる意見タイプ判定で比較する各タイプの典型文
+_OPINION_PROTOTYPES = (
+    (OpinionType.STRONGLY_AGREE, "この提案に強く賛成します。完全に同意し、ぜひ全面的に推進すべきです。"),
+    (OpinionType.AGREE, "この提案には概ね賛成です。良い方向性だと思います。"),
+    (OpinionType.NEUTRAL, "賛否どちらとも言えません。利点と課題の両面を整理する必要があります。"),
+    (OpinionType.DISAGREE, "この提案には反対です。いくつかの問題や懸念があります。"),
+    (OpinionType.STRONGLY_DISAGREE, "この提案には強く反対します。重大な問題があり、絶対に進めるべきではありません。"),
+)
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    """ベクトルを単位長に正規化（内積がそのままコサイン類似度になる）"""
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def _build_opinion_matcher():
+    """意見分析の全キーワードを1回の走査で検出するオートマトンを構築（pyahocorasickが無ければNone）"""
+    keywords = set(_CONFIDENCE_KEYWORDS)
+    for _, words in _OPINION_KEYWORDS + _EVIDENCE_KEYWORDS:
+        keywords.update(words)
+    
+    if ahocorasick is None:
+        return None, tuple(keywords)
+    
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton, tuple(keywords)
+
+
+_OPINION_AUTOMATON, _OPINION_ALL_KEYWORDS = _build_opinion_matcher()
+# キーワードに大文字・小文字の区別がある文字が無ければ、応答の小文字化（全文コピー）は不要
+_OPINION_KEYWORDS_CASELESS = all(keyword.lower() == keyword.upper() for keyword in _OPINION_ALL_KEYWORDS)
+
+
+def _find_opinion_keywords(text: str) -> set:
+    """テキストに出現する意見分析キーワードの集合を返す"""
+    if _OPINION_AUTOMATON is not None:
+        return {keyword for _, keyword in _OPINION_AUTOMATON.iter(text)}
+    
+    # pyahocorasickが無い場合はキーワードごとの部分文字列検索（C実装）で代替
+    # キーワード同士が重なって出現する（「明確実例」など）ため、単純な正規表現の選択では取りこぼす
+    return {keyword for keyword in _OPINION_ALL_KEYWORDS if keyword in text}
+
+
+def _llm_concurrency_from_env() -> int:
+    """環境変数LLM_CONCURRENCYから同時実行数を取得（数値でなければ既定値、1未満は1に切り上げ）"""
+    value = os.environ.get("LLM_CONCURRENCY", "").strip()
+    if not value:
+        return _DEFAULT_LLM_CONCURRENCY
+    try:
+        return max(1, int(value))
+    except ValueError:
+        print(f"⚠️ LLM_CONCURRENCY の値が不正です（{value!r}）。既定値 {_DEFAULT_LLM_CONCURRENCY} を使用します")
+        return _DEFAULT_LLM_CONCURRENCY
+
+
+def _json_default(obj):
+    """JSONに直接変換できないオブジェクトを変換（シリアライザから該当オブジェクトに対してのみ呼ばれる）"""
+    if isinstance(obj, Enum):
+        return obj.value
+    if is_dataclass(obj):
+        # slots付きデータクラスは__dict__を持たないためフィールドから取得
+        return {field.name: getattr(obj, field.name) for field in fields(obj)}
+    if isinstance(obj, Mapping):
+        # 読み取り専用の定数マッピング（解決戦略など）も辞書として出力
+        return dict(obj)
+    if hasattr(obj, '__dict__'):
+        return vars(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 
 class IntelligentCollaborationSystem:
@@ -25,7 +137,13 @@ class IntelligentCollaborationSystem:
     
     def __init__(self):
         # 基本コンポーネント
-        self.openai_client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        # ラウンド内の各エージェントの発言を並行生成するため、接続プール付きの非同期クライアントを全エージェントで共有
+        # （クライアントはイベントループに紐づくため、議論の実行ごとに_run_sessionで生成する）
+        self._http = None
+        self.openai_client = None
+        # API呼び出しの同時実行数の上限（レート制限による429リトライの連鎖を避ける）
+        self._llm_concurrency = _llm_concurrency_from_env()
+        self._llm_sem: Optional[asyncio.Semaphore] = None
         
         # 新機能コンポーネント
         self.agent_factory = AgentFactory()
@@ -39,9 +157,53 @@ class IntelligentCollaborationSystem:
         self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.conversation_log = []
         self.analysis_results = []
-        
+        # 埋め込みモデルを指定した場合は意見タイプを埋め込みの類似度で判定（未指定ならキーワード判定）
+        self._embedding_model = os.environ.get("OPINION_EMBEDDING_MODEL")
+        self._prototype_vectors: Optional[List[List[float]]] = None
+        
+        # 全ラウンドの意見（辞書化する前のOpinionオブジェクトを保持し、最終集計で再構築しない）
+        self._all_opinions: List[Opinion] = []
+        
+    def _create_openai_client(self):
+        """全エージェントで共有する非同期OpenAIクライアントを生成（openaiの読み込みは実際に使うときまで遅らせる）"""
+        import openai
+        import httpx
+        
+        # 全エージェントが同時に呼び出すため接続数とタイムアウトは多めにする
+        options = http_client_options(httpx, read_timeout=60.0, connect_timeout=5.0,
+                                      max_connections=64, max_keepalive_connections=32)
+        self._http = httpx.AsyncClient(**options)
+        return openai.AsyncOpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            timeout=options["timeout"],
+            http_client=self._http
+        )
+    
+    async def aclose(self):
+        """HTTP接続プールを閉じる"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+            self.openai_client = None
+    
     def run_intelligent_discussion(self, topic: str, num_agents: int = 4, max_rounds: int = 3) -> Dict[str, Any]:
         """インテリジェントな議論を実行"""
+        return asyncio.run(self._run_session(topic, num_agents, max_rounds))
+    
+    async def _run_session(self, topic: str, num_agents: int, max_rounds: int) -> Dict[str, Any]:
+        """議論を実行し、終了時に接続プールを閉じる（クライアントは実行ごとに作り直す）"""
+        self.openai_client = self._create_openai_client()
+        try:
+            return await self._run_intelligent_discussion_async(topic, num_agents, max_rounds)
+        finally:
+            await self.aclose()
+    
+    async def _run_intelligent_discussion_async(self, topic: str, num_agents: int, max_rounds: int) -> Dict[str, Any]:
+        """インテリジェントな議論を実行（1つのイベントループ上で全ラウンドを処理）"""
+        
+        # セマフォは実行中のイベントループ上で作る（Python 3.8/3.9では生成時のループに結び付くため）
+        self._llm_sem = asyncio.Semaphore(self._llm_concurrency)
+        self._all_opinions = []
         
         print(f"\n🚀 === インテリジェント協調多エージェントシステム ===")
         print(f"📅 セッションID: {self.session_id}")
@@ -55,7 +217,7 @@ class IntelligentCollaborationSystem:
         
         # Phase 2: 背景情報収集
         print(f"\n🔍 Phase 2: 背景情報収集・分析")
-        background_info = self._gather_background_information(topic)
+        background_info = await self._gather_background_information(topic)
         
         # Phase 3: 多ラウンド議論
         print(f"\n💬 Phase 3: インテリジェント議論開始")
@@ -66,7 +228,7 @@ class IntelligentCollaborationSystem:
             print(f"🔄 ラウンド {round_num}")
             print(f"{'='*60}")
             
-            round_result = self._execute_discussion_round(
+            round_result = await self._execute_discussion_round(
                 agents, topic, round_num, background_info, discussion_results
             )
             
@@ -74,7 +236,8 @@ class IntelligentCollaborationSystem:
             collaboration_analysis = self._analyze_collaboration(round_result["opinions"])
             round_result["collaboration_analysis"] = collaboration_analysis
             
-            # 辞書形式に変換してから結果に追加
+            # 辞書形式に変換してから結果に追加（Opinionオブジェクトは最終集計用に保持）
+            self._all_opinions.extend(round_result["opinions"])
             round_result["opinions"] = [self._opinion_to_dict(opinion) for opinion in round_result["opinions"]]
             discussion_results.append(round_result)
             
@@ -88,7 +251,7 @@ class IntelligentCollaborationSystem:
         
         # Phase 4: 最終統合・結論
         print(f"\n🎯 Phase 4: 最終統合・結論生成")
-        final_conclusion = self._generate_final_conclusion(discussion_results, topic)
+        final_conclusion = self._generate_final_conclusion(discussion_results, topic, self._all_opinions)
         
         # 結果構造の生成
         session_result = {
@@ -104,7 +267,7 @@ class IntelligentCollaborationSystem:
             "background_info": background_info,
             "discussion_rounds": discussion_results,
             "final_conclusion": final_conclusion,
-            "overall_collaboration_metrics": self._calculate_overall_metrics(discussion_results)
+            "overall_collaboration_metrics": self._calculate_overall_metrics(discussion_results, self._all_opinions)
         }
         
         # ログ保存
@@ -126,14 +289,18 @@ class IntelligentCollaborationSystem:
         
         return agents
     
-    def _gather_background_information(self, topic: str) -> Dict[str, Any]:
-        """背景情報を収集"""
+    async def _gather_background_information(self, topic: str) -> Dict[str, Any]:
+        """背景情報を収集（互いに独立したWeb検索とトレンド分析を並行実行）"""
         print("🔍 Web検索による情報収集...")
-        search_results = self.web_searcher.search_for_topic(topic, "web", 3)
-        search_summary = self.web_searcher.get_search_summary(search_results)
-        
         print("📈 トレンド分析...")
-        trend_analysis = self.trend_analyzer.analyze_trend(topic)
+        
+        # 検索・分析APIは同期実装のためスレッドで実行し、待ち時間を重ねる
+        loop = asyncio.get_running_loop()
+        search_results, trend_analysis = await asyncio.gather(
+            loop.run_in_executor(None, self.web_searcher.search_for_topic, topic, "web", 3),
+            loop.run_in_executor(None, self.trend_analyzer.analyze_trend, topic)
+        )
+        search_summary = self.web_searcher.get_search_summary(search_results)
         
         background = {
             "search_results": [
@@ -155,30 +322,36 @@ class IntelligentCollaborationSystem:
         
         return background
     
-    def _execute_discussion_round(self, agents: List[AgentProfile], topic: str, 
-                                round_num: int, background_info: Dict[str, Any], 
-                                previous_rounds: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """1ラウンドの議論を実行"""
+    async def _execute_discussion_round(self, agents: List[AgentProfile], topic: str, 
+                                      round_num: int, background_info: Dict[str, Any], 
+                                      previous_rounds: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """1ラウンドの議論を実行（各エージェントの発言は並行して生成）"""
         
         # コンテキスト準備
-        context = self._prepare_discussion_context(topic, round_num, background_info, previous_rounds)
+        context = self._prepare_discussion_context(topic, background_info, previous_rounds)
+        goal = self._round_goal(round_num)
+        
+        # 各エージェントの発言を同時に生成（結果はエージェントの順序のまま返る）
+        # 共通コンテキストは全エージェントで同じ文字列をユーザーメッセージの先頭に置き、エージェント固有の指示はシステムメッセージで渡す
+        responses = await asyncio.gather(*(
+            self._generate_agent_response(agent, context, goal) for agent in agents
+        ))
+        
+        # 埋め込みによる意見タイプ判定（ラウンドの全発言を1回のAPI呼び出しで処理）
+        semantic_types = await self._classify_round(responses)
         
-        # 各エージェントの発言生成
         agent_responses = []
         opinions = []
         
-        for i, agent in enumerate(agents, 1):
-            print(f"\n👤 [{agent.name}] の発言:")
-            
-            # エージェント固有のコンテキスト
-            agent_context = context + f"\n\n{agent.system_message}"
-            
-            # 発言生成
-            response = self._generate_agent_response(agent, agent_context)
-            print(response)
+        write = sys.stdout.write
+        for i, (agent, response) in enumerate(zip(agents, responses)):
+            # 見出し・発言・区切り線はまとめて1回で書き出す
+            write(f"\n👤 [{agent.name}] の発言:\n{response}\n{_SEP}\n")
             
             # 意見分析
-            opinion = self._extract_opinion_from_response(agent.name, response)
+            opinion = self._extract_opinion_from_response(
+                agent.name, response, semantic_types[i] if semantic_types else None
+            )
             opinions.append(opinion)
             
             agent_responses.append({
@@ -191,9 +364,8 @@ class IntelligentCollaborationSystem:
                     "evidence": opinion.evidence
                 }
             })
-            
-            print("-" * 50)
         
+        sys.stdout.flush()
         return {
             "round_number": round_num,
             "agent_responses": agent_responses,
@@ -201,90 +373,126 @@ class IntelligentCollaborationSystem:
             "timestamp": datetime.now().isoformat()
         }
     
-    def _prepare_discussion_context(self, topic: str, round_num: int, 
+    def _prepare_discussion_context(self, topic: str,
                                   background_info: Dict[str, Any], 
                                   previous_rounds: List[Dict[str, Any]]) -> str:
-        """議論コンテキストを準備"""
+        """議論コンテキスト（ラウンド内の全エージェントで共通の部分）を準備
+        
+        プロンプトキャッシュが効くよう、セッション中に変わらない部分（トピック・背景情報）を先頭に置き、
+        エージェント名や時刻など発言者ごとに変わる内容は含めない
+        """
         
-        context = f"議論トピック: {topic}\n\n"
+        parts = [f"議論トピック: {topic}\n\n"]
         
         # 背景情報
         if background_info.get("search_summary"):
-            context += f"背景情報:\n"
-            context += f"- 関連情報: {background_info['search_summary']['total_results']}件\n"
-            context += f"- トレンド: {background_info['trend_analysis']['sentiment']['overall']}\n\n"
+            parts.append(
+                f"背景情報:\n"
+                f"- 関連情報: {background_info['search_summary']['total_results']}件\n"
+                f"- トレンド: {background_info['trend_analysis']['sentiment']['overall']}\n\n"
+            )
         
         # 前ラウンドの要約
         if previous_rounds:
-            context += f"これまでの議論（ラウンド{len(previous_rounds)}まで）:\n"
+            parts.append(f"これまでの議論（ラウンド{len(previous_rounds)}まで）:\n")
             for prev_round in previous_rounds[-2:]:  # 最新2ラウンドのみ
-                round_num = prev_round["round_number"]
-                context += f"\nラウンド{round_num}の要点:\n"
-                for response in prev_round["agent_responses"]:
-                    agent_name = response["agent_name"]
-                    opinion_type = response["opinion"]["type"]
-                    context += f"- {agent_name}: {opinion_type}\n"
-        
-        context += f"\nラウンド{round_num}の目標: "
+                parts.append(f"\nラウンド{prev_round['round_number']}の要点:\n")
+                parts.extend(
+                    f"- {response['agent_name']}: {response['opinion']['type']}\n"
+                    for response in prev_round["agent_responses"]
+                )
+        
+        return "".join(parts)
+    
+    def _round_goal(self, round_num: int) -> str:
+        """ラウンドの目標を表す指示文"""
         if round_num == 1:
-            context += "初期意見の表明と論点の整理"
+            goal = "初期意見の表明と論点の整理"
         elif round_num == 2:
-            context += "異なる視点の提示と議論の深化"
+            goal = "異なる視点の提示と議論の深化"
         else:
-            context += "合意形成または最終的な立場の明確化"
-        
-        return context
+            goal = "合意形成または最終的な立場の明確化"
+        return f"ラウンド{round_num}の目標: {goal}"
     
-    def _generate_agent_response(self, agent: AgentProfile, context: str) -> str:
-        """エージェントの応答を生成"""
+    async def _generate_agent_response(self, agent: AgentProfile, context: str, goal: str) -> str:
+        """エージェントの応答を生成
+        
+        システムメッセージはエージェント固有の指示のみとし、ユーザーメッセージは
+        context（ラウンド内の全エージェントで共通）を先頭に、ラウンドの目標を後ろに続ける
+        """
         try:
             messages = [
                 {"role": "system", "content": agent.system_message},
-                {"role": "user", "content": context}
+                {"role": "user", "content": f"{context}\n\n{goal}"}
             ]
             
-            response = self.openai_client.chat.completions.create(
-                model=os.environ.get("MODEL_NAME", "gpt-3.5-turbo"),
-                messages=messages,
-                temperature=0.7,
-                max_tokens=400
-            )
+            async with self._llm_sem:
+                response = await self.openai_client.chat.completions.create(
+                    model=os.environ.get("MODEL_NAME", "gpt-3.5-turbo"),
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=400
+                )
             
             return response.choices[0].message.content
             
         except Exception as e:
             return f"[{agent.name}] エラーが発生しました: {e}"
     
-    def _extract_opinion_from_response(self, agent_name: str, response: str) -> Opinion:
-        """応答から意見を抽出"""
+    async def _classify_round(self, responses: List[str]) -> Optional[List[OpinionType]]:
+        """ラウンドの全発言の意見タイプを埋め込みの類似度でまとめて判定
+        
+        埋め込みモデル未指定時やAPIエラー時はNoneを返し、キーワード判定に任せる
+        """
+        if not self._embedding_model or not responses:
+            return None
+        
+        # 典型文の埋め込みは初回だけ、そのラウンドの発言と同じリクエストで取得する
+        inputs = list(responses)
+        if self._prototype_vectors is None:
+            inputs = [text for _, text in _OPINION_PROTOTYPES] + inputs
+        
+        try:
+            async with self._llm_sem:
+                result = await self.openai_client.embeddings.create(
+                    model=self._embedding_model,
+                    input=inputs
+                )
+        except Exception as e:
+            print(f"⚠️ 埋め込みによる意見判定に失敗したためキーワード判定を使用します: {e}")
+            return None
+        
+        vectors = [_normalize(item.embedding) for item in result.data]
+        if self._prototype_vectors is None:
+            self._prototype_vectors = vectors[:len(_OPINION_PROTOTYPES)]
+            vectors = vectors[len(_OPINION_PROTOTYPES):]
+        
+        types = []
+        for vector in vectors:
+            scores = [sum(a * b for a, b in zip(vector, prototype)) for prototype in self._prototype_vectors]
+            types.append(_OPINION_PROTOTYPES[scores.index(max(scores))][0])
+        return types
+    
+    def _extract_opinion_from_response(self, agent_name: str, response: str,
+                                       opinion_type: Optional[OpinionType] = None) -> Opinion:
+        """応答から意見を抽出（opinion_typeを渡した場合は意見タイプの判定にそれを使う）"""
         
         # 簡易的な意見分析（実際はもっと高度なNLP処理が必要）
-        response_lower = response.lower()
+        # 全カテゴリのキーワードを1回の走査でまとめて検出する
+        found = _find_opinion_keywords(response if _OPINION_KEYWORDS_CASELESS else response.lower())
         
         # 意見タイプの判定
-        if any(word in response_lower for word in ["強く賛成", "完全に同意", "絶対に"]):
-            opinion_type = OpinionType.STRONGLY_AGREE
-        elif any(word in response_lower for word in ["賛成", "同意", "良い", "正しい"]):
-            opinion_type = OpinionType.AGREE
-        elif any(word in response_lower for word in ["反対", "異議", "問題", "懸念"]):
-            opinion_type = OpinionType.DISAGREE
-        elif any(word in response_lower for word in ["強く反対", "完全に反対", "絶対に反対"]):
-            opinion_type = OpinionType.STRONGLY_DISAGREE
-        else:
-            opinion_type = OpinionType.NEUTRAL
+        if opinion_type is None:
+            opinion_type = next(
+                (op_type for op_type, words in _OPINION_KEYWORDS if not found.isdisjoint(words)),
+                OpinionType.NEUTRAL
+            )
         
         # 信頼度の計算（簡易実装）
-        confidence_indicators = ["確信", "明確", "間違いなく", "確実", "データ"]
-        confidence = min(0.5 + 0.1 * sum(1 for word in confidence_indicators if word in response_lower), 1.0)
+        confidence = min(0.5 + 0.1 * len(found & _CONFIDENCE_KEYWORDS), 1.0)
         
         # エビデンスの抽出
-        evidence = []
-        if "研究" in response_lower or "データ" in response_lower:
-            evidence.append("研究・データ")
-        if "経験" in response_lower or "実例" in response_lower:
-            evidence.append("経験・実例")
-        if "理論" in response_lower:
-            evidence.append("理論")
+        evidence = [label for label, words in _EVIDENCE_KEYWORDS if not found.isdisjoint(words)]
         
         return Opinion(
             agent_name=agent_name,
@@ -336,23 +544,12 @@ class IntelligentCollaborationSystem:
         
         return False
     
-    def _generate_final_conclusion(self, discussion_results: List[Dict[str, Any]], topic: str) -> Dict[str, Any]:
-        """最終結論を生成"""
-        
-        all_opinions = []
-        for round_result in discussion_results:
-            # 辞書形式のopinionをOpinionオブジェクトに変換
-            for opinion_dict in round_result["opinions"]:
-                opinion = Opinion(
-                    agent_name=opinion_dict["agent_name"],
-                    content=opinion_dict["content"],
-                    opinion_type=OpinionType(opinion_dict["opinion_type"]),
-                    confidence=opinion_dict["confidence"],
-                    evidence=opinion_dict["evidence"],
-                    related_topics=opinion_dict["related_topics"],
-                    timestamp=opinion_dict["timestamp"]
-                )
-                all_opinions.append(opinion)
+    def _generate_final_conclusion(self, discussion_results: List[Dict[str, Any]], topic: str,
+                                   all_opinions: Optional[List[Opinion]] = None) -> Dict[str, Any]:
+        """最終結論を生成（all_opinions省略時はラウンド結果の辞書から復元）"""
+        
+        if all_opinions is None:
+            all_opinions = self._opinions_from_results(discussion_results)
         
         # 最終的な協調分析
         final_collaboration = self.collaboration_orchestrator.process_agent_interactions(all_opinions, topic)
@@ -396,45 +593,56 @@ class IntelligentCollaborationSystem:
         else:
             return "現在の方向性での段階的進行を推奨します。"
     
-    def _calculate_overall_metrics(self, discussion_results: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """全体メトリクスを計算"""
-        all_opinions = []
-        for round_result in discussion_results:
-            # 辞書形式のopinionをOpinionオブジェクトに変換
-            for opinion_dict in round_result["opinions"]:
-                opinion = Opinion(
-                    agent_name=opinion_dict["agent_name"],
-                    content=opinion_dict["content"],
-                    opinion_type=OpinionType(opinion_dict["opinion_type"]),
-                    confidence=opinion_dict["confidence"],
-                    evidence=opinion_dict["evidence"],
-                    related_topics=opinion_dict["related_topics"],
-                    timestamp=opinion_dict["timestamp"]
-                )
-                all_opinions.append(opinion)
+    def _calculate_overall_metrics(self, discussion_results: List[Dict[str, Any]],
+                                   all_opinions: Optional[List[Opinion]] = None) -> Dict[str, Any]:
+        """全体メトリクスを計算（all_opinions省略時はラウンド結果の辞書から復元）"""
+        if all_opinions is None:
+            all_opinions = self._opinions_from_results(discussion_results)
         
-        # 参加度分析
+        # 参加度・意見タイプ・信頼度・エビデンス有無を1回の走査でまとめて集計
         agent_participation = {}
+        opinion_types = set()
+        confidence_sum = 0.0
+        evidence_count = 0
         for opinion in all_opinions:
             agent_name = opinion.agent_name
             agent_participation[agent_name] = agent_participation.get(agent_name, 0) + 1
+            opinion_types.add(opinion.opinion_type)
+            confidence_sum += opinion.confidence
+            if opinion.evidence:
+                evidence_count += 1
         
+        total = len(all_opinions)
         # 意見の多様性
-        opinion_types = [opinion.opinion_type.value for opinion in all_opinions]
-        opinion_diversity = len(set(opinion_types)) / len(OpinionType)
-        
+        opinion_diversity = len(opinion_types) / len(OpinionType)
         # 平均信頼度
-        avg_confidence = sum(opinion.confidence for opinion in all_opinions) / len(all_opinions)
+        avg_confidence = confidence_sum / total
         
         return {
             "total_rounds": len(discussion_results),
-            "total_opinions": len(all_opinions),
+            "total_opinions": total,
             "agent_participation": agent_participation,
             "opinion_diversity": round(opinion_diversity, 2),
             "average_confidence": round(avg_confidence, 2),
-            "evidence_usage_rate": len([op for op in all_opinions if op.evidence]) / len(all_opinions)
+            "evidence_usage_rate": evidence_count / total
         }
     
+    def _opinions_from_results(self, discussion_results: List[Dict[str, Any]]) -> List[Opinion]:
+        """ラウンド結果の辞書形式のopinionをOpinionオブジェクトに変換"""
+        return [
+            Opinion(
+                agent_name=opinion_dict["agent_name"],
+                content=opinion_dict["content"],
+                opinion_type=OpinionType(opinion_dict["opinion_type"]),
+                confidence=opinion_dict["confidence"],
+                evidence=opinion_dict["evidence"],
+                related_topics=opinion_dict["related_topics"],
+                timestamp=opinion_dict["timestamp"]
+            )
+            for round_result in discussion_results
+            for opinion_dict in round_result["opinions"]
+        ]
+    
     def _agent_profile_to_dict(self, agent: AgentProfile) -> Dict[str, Any]:
         """エージェントプロファイルを辞書に変換"""
         return {
@@ -466,31 +674,21 @@ class IntelligentCollaborationSystem:
         
         log_file = os.path.join(log_dir, f"intelligent_session_{self.session_id}.json")
         
-        # Opinionオブジェクトを辞書に変換するための前処理
-        serializable_result = self._make_json_serializable(session_result)
-        
-        with open(log_file, "w", encoding="utf-8") as f:
-            json.dump(serializable_result, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            # orjsonはデータクラス・Enumを直接扱い、UTF-8のバイト列を1回で書き出せる
+            # （浮動小数点の表記や非ASCII文字の扱いはjson.dumpと異なるが、読み込んだ内容は同じ）
+            data = orjson.dumps(
+                session_result, default=_json_default,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+            )
+            with open(log_file, "wb") as f:
+                f.write(data)
+        else:
+            # 変換が必要なオブジェクトだけdefaultで処理し、結果全体の事前コピーは作らない
+            with open(log_file, "w", encoding="utf-8") as f:
+                json.dump(session_result, f, ensure_ascii=False, indent=2, default=_json_default)
         
         print(f"📁 詳細ログ保存: {log_file}")
-    
-    def _make_json_serializable(self, obj):
-        """オブジェクトをJSONシリアライズ可能な形式に変換"""
-        if hasattr(obj, '__dict__'):
-            # データクラスやオブジェクトを辞書に変換
-            result = {}
-            for key, value in obj.__dict__.items():
-                if hasattr(value, 'value'):  # Enumの場合
-                    result[key] = value.value
-                else:
-                    result[key] = self._make_json_serializable(value)
-            return result
-        elif isinstance(obj, list):
-            return [self._make_json_serializable(item) for item in obj]
-        elif isinstance(obj, dict):
-            return {key: self._make_json_serializable(value) for key, value in obj.items()}
-        else:
-            return obj
 
 
 def main():
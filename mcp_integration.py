@@ -4,10 +4,24 @@ MCPツール統合モジュール
 """
 
 import json
+import re
 import subprocess
 from typing import Dict, Any, List, Optional
 
 
+# 文脈からツール提案の特徴を1回の走査で検出するパターン（グループ名が特徴名）
+# 先読みで各位置を調べ、異なる特徴のキーワードが重なっていても取りこぼさない
+_TOOL_FEATURE_PATTERN = re.compile(
+    "(?=(?:"
+    "(?P<library>ライブラリ|api|フレームワーク|ドキュメント)"
+    "|(?P<analysis>分析|評価|検討|詳細)"
+    "|(?P<code>コード|プログラム|実装|実行)"
+    "|(?P<tech>技術)"
+    "))"
+)
+_TOOL_FEATURE_COUNT = len(_TOOL_FEATURE_PATTERN.groupindex)
+
+
 class RealMCPIntegration:
     """実際のMCPツールとの統合クラス"""
     
@@ -198,10 +212,14 @@ class RealMCPIntegration:
         """文脈とエージェントの役割に基づいてツール使用を提案"""
         suggestions = []
         
-        # コンテキストベースの提案
-        context_lower = context.lower()
+        # コンテキストベースの提案（全特徴を1回の走査でまとめて検出）
+        features = set()
+        for match in _TOOL_FEATURE_PATTERN.finditer(context.lower()):
+            features.add(match.lastgroup)
+            if len(features) == _TOOL_FEATURE_COUNT:
+                break
         
-        if any(keyword in context_lower for keyword in ["ライブラリ", "api", "フレームワーク", "ドキュメント"]):
+        if "library" in features:
             if self.available_tools.get("context7"):
                 suggestions.append({
                     "tool": "context7",
@@ -209,7 +227,7 @@ class RealMCPIntegration:
                     "reason": "最新のライブラリ情報が議論に役立ちます"
                 })
         
-        if any(keyword in context_lower for keyword in ["分析", "評価", "検討", "詳細"]):
+        if "analysis" in features:
             if self.available_tools.get("gemini-cli"):
                 suggestions.append({
                     "tool": "gemini-cli", 
@@ -217,7 +235,7 @@ class RealMCPIntegration:
                     "reason": "Geminiによる深い分析が議論を発展させます"
                 })
         
-        if any(keyword in context_lower for keyword in ["コード", "プログラム", "実装", "実行"]):
+        if "code" in features:
             if self.available_tools.get("ide"):
                 suggestions.append({
                     "tool": "ide",
@@ -228,7 +246,7 @@ class RealMCPIntegration:
         # エージェント役割ベースの提案
         if agent_role == "creative_storyteller":
             # 語り手は新しい情報や視点を求める傾向
-            if self.available_tools.get("context7") and "技術" in context_lower:
+            if self.available_tools.get("context7") and "tech" in features:
                 suggestions.append({
                     "tool": "context7",
                     "action": "技術動向調査",
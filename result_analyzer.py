@@ -23,13 +23,16 @@ class ResultAnalyzer:
             return []
         
         sessions = []
-        for file_name in os.listdir(self.log_dir):
-            if file_name.endswith('.json') and file_name.startswith('intelligent_session_'):
+        # scandirで一覧取得とファイル情報取得を1回の走査で行う
+        with os.scandir(self.log_dir) as entries:
+            for entry in entries:
+                file_name = entry.name
+                if not (file_name.endswith('.json') and file_name.startswith('intelligent_session_')):
+                    continue
                 session_id = file_name.replace('intelligent_session_', '').replace('.json', '')
-                file_path = os.path.join(self.log_dir, file_name)
                 
                 # ファイル情報を取得
-                stat = os.stat(file_path)
+                stat = entry.stat()
                 created_time = datetime.fromtimestamp(stat.st_ctime).strftime('%Y-%m-%d %H:%M')
                 file_size = f"{stat.st_size / 1024:.1f} KB"
                 
@@ -42,9 +45,13 @@ class ResultAnalyzer:
         
         return sorted(sessions, key=lambda x: x['session_id'], reverse=True)
     
+    def session_path(self, session_id: str) -> str:
+        """セッションログのファイルパスを取得"""
+        return os.path.join(self.log_dir, f"intelligent_session_{session_id}.json")
+    
     def load_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """セッション結果を読み込み"""
-        file_path = os.path.join(self.log_dir, f"intelligent_session_{session_id}.json")
+        file_path = self.session_path(session_id)
         
         if not os.path.exists(file_path):
             return None
@@ -202,6 +202,22 @@ def test_html_viewer():
             print("❌ インデックスページの生成に失敗")
             return False
         
+        # エスケープテスト（トピックなど外部由来の文字列がHTMLとして解釈されないこと）
+        escape_session = {
+            "session_info": {"session_id": "escape_check", "topic": "<script>alert(1)</script>",
+                             "timestamp": "2025-01-01T00:00:00", "num_agents": 0,
+                             "max_rounds": 0, "actual_rounds": 0},
+            "agents": [],
+            "discussion_rounds": [],
+            "final_conclusion": {"consensus_level": 0.0, "conclusion_text": "", "recommendation": ""},
+            "overall_collaboration_metrics": {"total_opinions": 0},
+        }
+        html = viewer._generate_html_content(escape_session, viewer.analyzer.analyze_session(escape_session))
+        if "<script>alert(1)</script>" in html or "&lt;script&gt;alert(1)&lt;/script&gt;" not in html:
+            print("❌ トピックがHTMLエスケープされていません")
+            return False
+        print("✅ トピックのHTMLエスケープ")
+        
         # セッション報告書生成テスト（セッションが存在する場合）
         from result_analyzer import ResultAnalyzer
         analyzer = ResultAnalyzer()
@@ -253,6 +269,178 @@ def test_mcp_integration():
         return False
 
 
+def test_direct_batch():
+    """シンプル版バッチ実行のテスト（同じプロセスで続けて実行してもAPI呼び出しが失敗しないこと）"""
+    print("\n📦 シンプル版バッチ実行テスト")
+    
+    try:
+        import asyncio
+        from types import SimpleNamespace
+        import main_direct
+        
+        created = []
+        
+        class LoopBoundClient:
+            """生成時のイベントループ以外から使われるとhttpxと同様に失敗するテスト用クライアント"""
+            def __init__(self):
+                self.loop = asyncio.get_running_loop()
+                self.closed = False
+                self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+                created.append(self)
+            
+            async def _create(self, **kwargs):
+                if self.closed or asyncio.get_running_loop() is not self.loop:
+                    raise RuntimeError("Event loop is closed")
+                message = SimpleNamespace(content=f"応答: {kwargs['messages'][-1]['content'][:10]}")
+                return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+            
+            async def close(self):
+                self.closed = True
+        
+        original_factory = main_direct._create_async_openai_client
+        main_direct._create_async_openai_client = LoopBoundClient
+        try:
+            # asyncio.runを2回続けて実行（2回目は別のイベントループになる）
+            for batch in (["トピックA", "トピックB"], ["トピックC"]):
+                results = asyncio.run(main_direct._run_batch(batch))
+                errors = [r for responses in results for r in responses.values() if r.startswith("APIエラー")]
+                if errors:
+                    print(f"❌ バッチ実行でAPIエラー: {errors[0]}")
+                    return False
+        finally:
+            main_direct._create_async_openai_client = original_factory
+        
+        if not all(client.closed for client in created):
+            print("❌ バッチ実行後にクライアントが閉じられていません")
+            return False
+        
+        print(f"✅ バッチを{len(created)}回続けて実行（クライアントは実行ごとに生成・終了）")
+        print("✅ シンプル版バッチ実行テスト完了")
+        return True
+        
+    except Exception as e:
+        print(f"❌ シンプル版バッチ実行テストエラー: {e}")
+        return False
+
+
+def test_agent_request_messages():
+    """エージェントへのリクエスト構成のテスト（システムメッセージは1つ、共通コンテキストはユーザーメッセージの先頭）"""
+    print("\n✉️ エージェントリクエスト構成テスト")
+    
+    try:
+        import asyncio
+        from types import SimpleNamespace
+        from main_intelligent_collaboration import IntelligentCollaborationSystem
+        
+        requests_sent = []
+        
+        async def create(**kwargs):
+            requests_sent.append(kwargs["messages"])
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="応答"))])
+        
+        system = IntelligentCollaborationSystem()
+        agents = system.agent_factory.analyze_topic_and_generate_agents("AIの倫理的な開発について", 3)
+        context = system._prepare_discussion_context("AIの倫理的な開発について", {}, [])
+        goal = system._round_goal(1)
+        
+        async def run_round():
+            system.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+            system._llm_sem = asyncio.Semaphore(1)
+            for agent in agents:
+                await system._generate_agent_response(agent, context, goal)
+        
+        asyncio.run(run_round())
+        system.openai_client = None
+        
+        if len(requests_sent) != len(agents):
+            print(f"❌ リクエスト数が不正: {len(requests_sent)}/{len(agents)}")
+            return False
+        
+        for agent, messages in zip(agents, requests_sent):
+            roles = [message["role"] for message in messages]
+            if roles != ["system", "user"] or messages[0]["content"] != agent.system_message:
+                print(f"❌ {agent.name} のリクエスト構成が不正: {roles}")
+                return False
+            if not messages[1]["content"].startswith(context) or not messages[1]["content"].endswith(goal):
+                print(f"❌ {agent.name} のユーザーメッセージが共通コンテキストで始まっていません")
+                return False
+        
+        print(f"✅ {len(requests_sent)}件のリクエストを確認（システムメッセージ1つ＋共通コンテキスト先頭のユーザーメッセージ）")
+        print("✅ エージェントリクエスト構成テスト完了")
+        return True
+        
+    except Exception as e:
+        print(f"❌ エージェントリクエスト構成テストエラー: {e}")
+        return False
+
+
+def test_session_log_serialization():
+    """セッションログ保存のテスト（orjsonの有無で、読み込んだ内容が同じになること）"""
+    print("\n💾 セッションログ保存テスト")
+    
+    try:
+        import tempfile
+        from types import MappingProxyType
+        import main_intelligent_collaboration
+        from main_intelligent_collaboration import IntelligentCollaborationSystem
+        from collaboration_system import Opinion, OpinionType, Consensus
+        
+        opinion = Opinion(
+            agent_name="テストエージェント",
+            content="データに基づき賛成します。",
+            opinion_type=OpinionType.AGREE,
+            confidence=0.1 + 0.2,
+            evidence=["研究・データ"],
+            related_topics=["効率性"],
+            timestamp=datetime.now().isoformat()
+        )
+        session_result = {
+            "session_info": {"topic": "テスト", "tiny": 1e-7, "large": 1e16, "count": 3},
+            "opinions": [opinion],
+            "consensus": Consensus("テスト", ["合意点"], [], 0.75, ["テストエージェント"], "投票"),
+            "strategy": MappingProxyType({"strategy": "consensus_building", "weight": 2.5}),
+            "types": [OpinionType.STRONGLY_AGREE, OpinionType.DISAGREE],
+        }
+        
+        system = IntelligentCollaborationSystem()
+        original_orjson = main_intelligent_collaboration.orjson
+        original_cwd = os.getcwd()
+        loaded = {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                # orjsonがあればorjson経由と標準json経由の両方で保存して比較
+                backends = [("json", None)]
+                if original_orjson is not None:
+                    backends.insert(0, ("orjson", original_orjson))
+                for name, backend in backends:
+                    main_intelligent_collaboration.orjson = backend
+                    system._save_session_log(session_result)
+                    log_file = os.path.join("intelligent_collaboration_logs",
+                                            f"intelligent_session_{system.session_id}.json")
+                    with open(log_file, encoding="utf-8") as f:
+                        loaded[name] = json.load(f)
+            finally:
+                main_intelligent_collaboration.orjson = original_orjson
+                os.chdir(original_cwd)
+        
+        if len(loaded) == 2 and loaded["orjson"] != loaded["json"]:
+            print("❌ orjsonと標準jsonで保存内容が異なります")
+            return False
+        if loaded["json"]["opinions"][0]["opinion_type"] != OpinionType.AGREE.value:
+            print("❌ Enumが値として保存されていません")
+            return False
+        
+        backends_checked = "orjson・標準json" if len(loaded) == 2 else "標準json（orjson未インストール）"
+        print(f"✅ 保存したログを読み込み確認: {backends_checked}")
+        print("✅ セッションログ保存テスト完了")
+        return True
+        
+    except Exception as e:
+        print(f"❌ セッションログ保存テストエラー: {e}")
+        return False
+
+
 def create_demo_session():
     """デモセッションの作成"""
     print("\n🚀 デモセッション作成")
@@ -458,7 +646,10 @@ def run_full_integration_test():
         ("Web検索", test_web_search_agent),
         ("MCP統合", test_mcp_integration),
         ("結果分析", test_result_analyzer),
-        ("HTMLビューアー", test_html_viewer)
+        ("HTMLビューアー", test_html_viewer),
+        ("バッチ実行", test_direct_batch),
+        ("リクエスト構成", test_agent_request_messages),
+        ("ログ保存", test_session_log_serialization)
     ]
     
     for test_name, test_func in test_functions:
@@ -540,7 +731,10 @@ def main():
             "websearch": test_web_search_agent,
             "mcp": test_mcp_integration,
             "analyzer": test_result_analyzer,
-            "html": test_html_viewer
+            "html": test_html_viewer,
+            "batch": test_direct_batch,
+            "messages": test_agent_request_messages,
+            "log": test_session_log_serialization
         }
         
         if args.component in component_tests:
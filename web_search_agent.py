@@ -3,7 +3,6 @@
 議論に必要な最新情報を自動収集
 """
 
-import requests
 import json
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass